@@ -0,0 +1,18 @@
+# ======================================
+# YOcreator — Media Pipeline Benchmarks
+# benchmarks/media/__init__.py
+# ======================================
+# Offline, CPU-only benchmarks for the avatar/video pipeline. Inputs are
+# generated synthetically (seeded), so runs are reproducible on any Linux
+# box with numpy, OpenCV and (for the encode cases) ffmpeg:
+#
+#   python -m benchmarks.media                      # all cases, compare to baseline
+#   python -m benchmarks.media --quick              # skip the 600s / 4K cases
+#   python -m benchmarks.media --case lipsync_fallback_60s
+#   python -m benchmarks.media --save-baseline      # record this box's numbers
+#
+# Each case runs in its own subprocess so peak RSS is per case. Results are
+# written as JSON to benchmarks/media/results/ and compared against
+# benchmarks/media/baseline.json. The committed baseline is a --quick run on
+# a 1-CPU Linux box (see its "environment"); long cases are not compared
+# until a full run is saved on the reference machine.
@@ -0,0 +1,128 @@
+# ======================================
+# YOcreator — Benchmark Cases
+# benchmarks/media/cases.py
+# ======================================
+# Each case prepares its inputs, then returns a run() callable for the
+# timed section. run() returns {"frames", "bytes", "outputs"}: frames and
+# bytes processed (for fps and MB/s) and files to delete afterwards.
+
+import os
+import glob
+
+from . import inputs
+
+CASE_FPS = 25
+
+
+class Case:
+    def __init__(self, name, setup, long=False, needs_ffmpeg=False):
+        self.name = name
+        self.setup = setup
+        self.long = long
+        self.needs_ffmpeg = needs_ffmpeg
+
+
+def _create_avatar_haar(resolution):
+    def setup(workdir):
+        import create_avatar
+        create_avatar.INSIGHTFACE_AVAILABLE = False   # time the Haar fallback
+        photos = inputs.photo_set(workdir, resolution)
+        size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(photos, "*")))
+
+        def run():
+            result = create_avatar.create_avatar(photos, "bench_avatar", use_cache=False)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            return {
+                "frames": inputs.PHOTOS_PER_SET,
+                "bytes": size,
+                "faces": result["face_count"],
+                "outputs": [result["output"], result["reference"]],
+            }
+        return run
+    return setup
+
+
+def _lipsync_fallback(seconds):
+    def setup(workdir):
+        import lipsync
+        lipsync.WAV2LIP_AVAILABLE = False   # time the fallback renderer
+        avatar_dir = inputs.avatar_dir(workdir)
+        audio = inputs.speech_wav(workdir, seconds)
+
+        def run():
+            # The production path: lipsync_stream() frames, as the encoder pulls them
+            result = lipsync.lipsync_stream(avatar_dir, audio, fps=CASE_FPS, debug_dump=False)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            frames = sum(1 for _ in result["frames"])
+            h, w = result["size"]
+            return {"frames": frames, "bytes": frames * h * w * 3, "outputs": []}
+        return run
+    return setup
+
+
+def _frames_to_video(frames, h, w):
+    def setup(workdir):
+        import lipsync
+        stack = inputs.frame_stack(workdir, frames, h, w)
+        out = os.path.join(workdir, "bench_frames_to_video.mp4")
+
+        def run():
+            result = lipsync.frames_to_video(stack, out, fps=CASE_FPS)
+            return {"frames": result["frames"], "bytes": frames * h * w * 3, "outputs": [out]}
+        return run
+    return setup
+
+
+def _render_from_frames(frames, h, w, profile):
+    def setup(workdir):
+        import render_final
+        stack = inputs.frame_stack(workdir, frames, h, w)
+        audio = inputs.speech_wav(workdir, 10)
+
+        def run():
+            stats = {}
+            out = render_final.render_from_frames(stack, audio, "bench_render", fps=CASE_FPS,
+                                                  stats=stats, profile=profile)
+            return {"frames": stats["frames"], "bytes": frames * h * w * 3, "outputs": [out]}
+        return run
+    return setup
+
+
+def _render_final(with_background):
+    def setup(workdir):
+        import render_final
+        avatar = inputs.video_file(workdir, "avatar", 10, 720, 1280)
+        job = {
+            "avatar_path": avatar,
+            "voice_path": inputs.speech_wav(workdir, 10),
+            "music_path": inputs.speech_wav(workdir, 10),
+            "music_volume": 0.3,
+        }
+        if with_background:
+            job["background_path"] = inputs.video_file(workdir, "background", 10, 1080, 1920)
+        size = sum(os.path.getsize(p) for k, p in job.items() if k.endswith("_path"))
+
+        def run():
+            out = render_final.render_final(job)
+            return {"frames": 10 * CASE_FPS, "bytes": size, "outputs": [out]}
+        return run
+    return setup
+
+
+CASES = [
+    Case("create_avatar_haar_480p", _create_avatar_haar("480p")),
+    Case("create_avatar_haar_1080p", _create_avatar_haar("1080p")),
+    Case("create_avatar_haar_2160p", _create_avatar_haar("2160p"), long=True),
+    Case("lipsync_fallback_10s", _lipsync_fallback(10)),
+    Case("lipsync_fallback_60s", _lipsync_fallback(60)),
+    Case("lipsync_fallback_600s", _lipsync_fallback(600), long=True),
+    Case("frames_to_video_720p", _frames_to_video(250, 720, 1280)),
+    Case("render_from_frames_720p_draft", _render_from_frames(250, 720, 1280, "draft"), needs_ffmpeg=True),
+    Case("render_from_frames_720p_master", _render_from_frames(250, 720, 1280, "master"), needs_ffmpeg=True),
+    Case("render_final_audio_only", _render_final(False), needs_ffmpeg=True),
+    Case("render_final_background", _render_final(True), needs_ffmpeg=True),
+]
+
+CASES_BY_NAME = {case.name: case for case in CASES}
@@ -0,0 +1,116 @@
+# ======================================
+# YOcreator — Benchmark Inputs
+# benchmarks/media/inputs.py
+# ======================================
+# Seeded synthetic inputs: drawn face photos (detectable by the Haar
+# cascade), speech-like WAVs, avatar data directories and frame stacks.
+# Everything is written once into a work directory and reused by later runs.
+
+import os
+import sys
+import subprocess
+
+import cv2
+import numpy as np
+from scipy.io import wavfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+for _path in (os.path.join(REPO_ROOT, "server/python"), os.path.join(REPO_ROOT, "server/python/avatar"),
+              os.path.join(REPO_ROOT, "pipeline")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+SAMPLE_RATE = 24000
+RESOLUTIONS = {"480p": (480, 640), "1080p": (1080, 1920), "2160p": (2160, 3840)}
+PHOTOS_PER_SET = 12
+
+
+def face_image(h, w, seed=0):
+    """A drawn frontal face on a noisy background; BGR uint8"""
+    rng = np.random.default_rng(seed)
+    img = np.empty((h, w, 3), dtype=np.uint8)
+    img[:] = rng.integers(90, 160, 3)
+    img = cv2.add(img, rng.integers(0, 20, (h, w, 3), dtype=np.uint8))
+
+    s = min(h, w) / 480
+    cx, cy = w // 2 + int(rng.integers(-20, 20) * s), h // 2
+    cv2.ellipse(img, (cx, cy), (int(110 * s), int(145 * s)), 0, 0, 360, (150, 175, 215), -1)
+    for dx in (-1, 1):
+        ex, ey = cx + dx * int(45 * s), cy - int(30 * s)
+        cv2.ellipse(img, (ex, ey - int(22 * s)), (int(28 * s), int(7 * s)), 0, 0, 360, (40, 50, 70), -1)
+        cv2.ellipse(img, (ex, ey), (int(22 * s), int(11 * s)), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(img, (ex, ey), int(8 * s), (40, 30, 20), -1)
+    cv2.line(img, (cx, cy - int(15 * s)), (cx - int(8 * s), cy + int(30 * s)), (120, 140, 180), max(1, int(4 * s)))
+    cv2.ellipse(img, (cx, cy + int(70 * s)), (int(40 * s), int(12 * s)), 0, 0, 360, (90, 90, 170), -1)
+    return cv2.GaussianBlur(img, (0, 0), 1.5 * s)
+
+
+def photo_set(workdir, resolution):
+    """Directory of PHOTOS_PER_SET face JPEGs at a named resolution"""
+    path = os.path.join(workdir, f"photos_{resolution}")
+    if not os.path.isdir(path):
+        h, w = RESOLUTIONS[resolution]
+        tmp = f"{path}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for i in range(PHOTOS_PER_SET):
+            cv2.imwrite(os.path.join(tmp, f"face_{i:02d}.jpg"), face_image(h, w, seed=i))
+        os.replace(tmp, path)
+    return path
+
+
+def speech_wav(workdir, seconds):
+    """Mono int16 WAV: voiced harmonics under a syllable-rate envelope, with pauses"""
+    path = os.path.join(workdir, f"speech_{seconds}s.wav")
+    if not os.path.exists(path):
+        rng = np.random.default_rng(seconds)
+        n = int(seconds * SAMPLE_RATE)
+        t = np.arange(n, dtype=np.float32) / SAMPLE_RATE
+        pitch = 140 + 20 * np.sin(2 * np.pi * 0.3 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.6)
+        audio = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(n)
+        wavfile.write(path, SAMPLE_RATE, (np.clip(audio, -1, 1) * 32767).astype(np.int16))
+    return path
+
+
+def avatar_dir(workdir, size=256, count=8):
+    """Avatar data directory built from synthetic faces (no detection needed)"""
+    from avatar_format import write_avatar_data
+
+    path = os.path.join(workdir, f"avatar_{size}")
+    if not os.path.isdir(path):
+        faces = []
+        for i in range(count):
+            img = face_image(size, size, seed=100 + i)
+            c = size / 2
+            faces.append({"img": img, "bbox": [c - 0.3 * size, c - 0.35 * size, c + 0.3 * size, c + 0.35 * size]})
+        write_avatar_data(path, faces, backend="synthetic")
+    return path
+
+
+def frame_stack(workdir, frames, h, w):
+    """[frames, h, w, 3] uint8 .npy of moving synthetic faces"""
+    path = os.path.join(workdir, f"frames_{frames}x{w}x{h}.npy")
+    if not os.path.exists(path):
+        base = face_image(h, w, seed=7)
+        stack = np.lib.format.open_memmap(f"{path}.tmp.npy", mode="w+", dtype=np.uint8, shape=(frames, h, w, 3))
+        for i in range(frames):
+            stack[i] = np.roll(base, (i * 3) % w, axis=1)
+        stack.flush()
+        del stack
+        os.replace(f"{path}.tmp.npy", path)
+    return path
+
+
+def video_file(workdir, name, seconds, h, w):
+    """H.264 test-pattern video via ffmpeg's lavfi source (no network, no input files)"""
+    path = os.path.join(workdir, f"{name}_{seconds}s_{w}x{h}.mp4")
+    if not os.path.exists(path):
+        subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate=25",
+            "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            path
+        ], check=True)
+    return path
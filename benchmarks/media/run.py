@@ -0,0 +1,202 @@
+# ======================================
+# YOcreator — Benchmark Runner
+# benchmarks/media/run.py
+# ======================================
+# Runs every case in a fresh subprocess, then writes JSON results and the
+# comparison against the stored baseline.
+#
+# Per case:
+#   seconds, fps, mb_per_s      timed pass, best of --repeat runs
+#   peak_rss_mb                 subprocess high-water RSS (incl. ffmpeg children)
+#   traced_peak_mb, alloc_blocks  tracemalloc pass (separate, as tracing slows the code)
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_DIR = os.path.join(HERE, "results")
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "yocreator-bench")
+
+# Slower than baseline by more than this fraction counts as a regression
+DEFAULT_THRESHOLD = 0.15
+
+
+def _cleanup(paths):
+    for path in paths or []:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def run_case(name, workdir, repeat=1, trace=True):
+    """Measure one case in this process; returns its result dict"""
+    from .cases import CASES_BY_NAME
+
+    run = CASES_BY_NAME[name].setup(workdir)
+
+    best = None
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        info = run()
+        elapsed = time.perf_counter() - started
+        _cleanup(info.pop("outputs", None))
+        best = elapsed if best is None else min(best, elapsed)
+
+    result = {
+        "seconds": round(best, 4),
+        "frames": info["frames"],
+        "fps": round(info["frames"] / best, 2) if best > 0 else None,
+        "mb_per_s": round(info["bytes"] / best / 1e6, 2) if best > 0 else None,
+        **{k: v for k, v in info.items() if k not in ("frames", "bytes")},
+    }
+
+    if trace:
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        traced = run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _cleanup(traced.get("outputs"))
+        result["traced_peak_mb"] = round(traced_peak / 1e6, 2)
+        result["alloc_blocks"] = sys.getallocatedblocks() - blocks_before
+
+    # ru_maxrss is KiB on Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    result["peak_rss_mb"] = round(max(self_rss, child_rss) / 1024, 1)
+    return result
+
+
+def _run_in_subprocess(name, args):
+    cmd = [
+        sys.executable, "-m", "benchmarks.media.run",
+        "--child", name,
+        "--workdir", args.workdir,
+        "--repeat", str(args.repeat),
+    ]
+    if args.no_trace:
+        cmd.append("--no-trace")
+    proc = subprocess.run(cmd, cwd=os.path.abspath(os.path.join(HERE, "../..")),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr or proc.stdout)[-2000:]}
+    # The case may print progress; the result is the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Per-case change in seconds vs. baseline; regression when slower by > threshold"""
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or "seconds" not in base or "seconds" not in result:
+            continue
+        change = (result["seconds"] - base["seconds"]) / base["seconds"]
+        comparison[name] = {
+            "baseline_seconds": base["seconds"],
+            "seconds": result["seconds"],
+            "change": round(change, 4),
+            "peak_rss_change_mb": round(result.get("peak_rss_mb", 0) - base.get("peak_rss_mb", 0), 1),
+            "regression": change > threshold,
+        }
+    return comparison
+
+
+def _environment():
+    import numpy
+    import cv2
+    return {
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "opencv": cv2.__version__,
+        "ffmpeg": bool(shutil.which("ffmpeg")),
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.media", description="YOcreator media benchmarks")
+    parser.add_argument("--case", action="append", help="Run only these cases (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Skip the long cases (600s audio, 4K photos)")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per case; the best is kept")
+    parser.add_argument("--no-trace", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="Where generated inputs are kept")
+    parser.add_argument("--output", help="Results JSON path (default results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.workdir, args.repeat, trace=not args.no_trace)))
+        return 0
+
+    from .cases import CASES
+    has_ffmpeg = bool(shutil.which("ffmpeg"))
+    selected = [c for c in CASES if (not args.case or c.name in args.case) and not (args.quick and c.long)]
+
+    results = {}
+    for case in selected:
+        if case.needs_ffmpeg and not has_ffmpeg:
+            results[case.name] = {"skipped": "ffmpeg not found"}
+            continue
+        print(f"{case.name} ...", end=" ", flush=True)
+        results[case.name] = _run_in_subprocess(case.name, args)
+        r = results[case.name]
+        print(r.get("error", "").splitlines()[-1] if "error" in r else
+              f"{r['seconds']:.3f}s  {r['fps']} fps  {r['mb_per_s']} MB/s  rss {r['peak_rss_mb']} MB")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    comparison = compare(results, baseline, args.threshold)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "cases": results,
+        "comparison": comparison,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results: {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({k: report[k] for k in ("created_at", "environment", "cases")}, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+
+    regressions = [name for name, c in comparison.items() if c["regression"]]
+    for name in regressions:
+        c = comparison[name]
+        print(f"REGRESSION {name}: {c['baseline_seconds']:.3f}s -> {c['seconds']:.3f}s ({c['change']:+.1%})")
+    if not baseline and not args.save_baseline:
+        print("No baseline to compare against (run with --save-baseline on the reference machine)")
+
+    failed = [name for name, r in results.items() if "error" in r]
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
+try:
+    from .lazy_imports import LazyModule
+except ImportError:
+    from lazy_imports import LazyModule
+
+# Imported on the first forge_avatar() call
+_engine = LazyModule("server.python.avatar.render", "avatar.render")
+
+
 def forge_avatar(payload):
     """
     Wrapper for avatar generation pipeline
     Calls server/python/avatar/render.py
     """
-    from server.python.avatar.render import run_avatar
-    return run_avatar(payload)
+    return _engine.run_avatar(payload)
@@ -1,7 +1,15 @@
+try:
+    from .lazy_imports import LazyModule
+except ImportError:
+    from lazy_imports import LazyModule
+
+# Imported on the first forge_video() call
+_engine = LazyModule("server.python.video.generate", "video.generate")
+
+
 def forge_video(payload):
     """
     Wrapper for video generation pipeline
     Calls server/python/video/generate.py
     """
-    from server.python.video.generate import run_video
-    return run_video(payload)
+    return _engine.run_video(payload)
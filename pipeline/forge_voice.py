@@ -1,7 +1,15 @@
+try:
+    from .lazy_imports import LazyModule
+except ImportError:
+    from lazy_imports import LazyModule
+
+# Imported on the first forge_voice() call
+_engine = LazyModule("server.python.voice.inference", "voice.inference")
+
+
 def forge_voice(payload):
     """
     Wrapper for voice generation pipeline
     Calls server/python/voice/inference.py
     """
-    from server.python.voice.inference import run_voice
-    return run_voice(payload)
+    return _engine.run_voice(payload)
@@ -0,0 +1,120 @@
+# ======================================
+# YOcreator — Lazy Imports
+# pipeline/lazy_imports.py
+# ======================================
+# Defers heavy engine modules (cv2, torch, insightface, onnxruntime) until
+# the first job that needs them, and records what each import cost:
+#
+#   _avatar = LazyModule("server.python.avatar.create_avatar", "avatar.create_avatar")
+#   _avatar.create_avatar(...)      # imported here, on first attribute access
+#
+# import_report() lists every timed import with the top-level packages it
+# pulled in; cross-check the numbers with `python -X importtime`.
+
+import sys
+import time
+import threading
+import importlib
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_records = []
+
+
+@contextmanager
+def timed_import(name):
+    """Time the imports inside the block and record them under `name`"""
+    before = set(sys.modules)
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    # Third-party/project packages only; stdlib modules would drown them out
+    stdlib = getattr(sys, "stdlib_module_names", ())
+    new_packages = sorted({
+        top for top in (m.split(".")[0] for m in set(sys.modules) - before)
+        if top not in stdlib and not top.startswith("_")
+    })
+    with _lock:
+        _records.append({
+            "module": name,
+            "seconds": round(elapsed, 4),
+            "new_packages": new_packages,
+            "thread": threading.current_thread().name,
+        })
+
+
+class LazyModule:
+    """
+    Module proxy that imports on first attribute access.
+
+    The names are tried in order, e.g. the repo-root package path first and
+    the flat container layout as the fallback, like the worker's imports.
+    """
+
+    def __init__(self, *names):
+        self._names = names
+        self._module = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._names[0]
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        """Import (once) and return the real module"""
+        if self._module is not None:
+            return self._module
+        with self._load_lock:
+            if self._module is None:
+                errors = []
+                for name in self._names:
+                    try:
+                        with timed_import(name):
+                            module = importlib.import_module(name)
+                    except ImportError as e:
+                        errors.append(f"{name}: {e}")
+                        continue
+                    self._module = module
+                    break
+                else:
+                    raise ImportError(f"Could not import {' or '.join(self._names)} ({'; '.join(errors)})")
+        return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self.name} ({state})>"
+
+
+def prewarm(modules, name="prewarm"):
+    """Import the given LazyModules on a daemon thread; returns the thread"""
+    def _run():
+        for module in modules:
+            try:
+                module.load()
+            except Exception as e:
+                print(f"Prewarm failed: {module.name}: {e}")
+        print(f"Prewarm done: {import_summary()}")
+
+    thread = threading.Thread(target=_run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def import_report():
+    """Timed imports so far, slowest first"""
+    with _lock:
+        return sorted((dict(r) for r in _records), key=lambda r: -r["seconds"])
+
+
+def import_summary():
+    """One-line "module 1.23s, ..." summary of import_report()"""
+    return ", ".join(f"{r['module']} {r['seconds']:.2f}s" for r in import_report()) or "none"
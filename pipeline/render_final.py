@@ -5,12 +5,21 @@
 # Assembles avatar video + voice audio into final MP4
 
 import os
+import time
+import shutil
+import itertools
 import subprocess
+import tempfile
 import uuid
 import cv2
 import numpy as np
 from pathlib import Path
 
+try:
+    from .render_profiles import get_profile, video_encode_args, audio_encode_args
+except ImportError:
+    from render_profiles import get_profile, video_encode_args, audio_encode_args
+
 # Use relative paths that work in both local and container environments
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_DIR = os.path.join(BASE_DIR, "cache")
@@ -19,53 +28,167 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
 Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
+# "pipe": raw frames -> one ffmpeg (H.264 + AAC, single encode)
+# "legacy": OpenCV mp4v intermediate, then ffmpeg re-encode + audio mux
+RENDER_ENCODER = os.getenv("RENDER_ENCODER", "pipe")
+
+
+def _open_frames(frames):
+    """
+    Normalize render input to (first_frame, iterator over all frames).
+
+    Accepts a path to a .npy frame stack (memory-mapped; legacy pickled
+    lists are loaded whole) or any iterable of frames, e.g. the generator
+    from lipsync_stream(). Legacy dict frames ({"img": ...}) are unwrapped.
+    """
+    if isinstance(frames, (str, os.PathLike)):
+        if not os.path.exists(frames):
+            raise FileNotFoundError(f"Frames not found: {frames}")
+        try:
+            frames = np.load(frames, mmap_mode="r")
+        except ValueError:
+            frames = np.load(frames, allow_pickle=True)
+
+    unwrapped = (f.get("img", f) if isinstance(f, dict) else f for f in frames)
+    first = next(unwrapped, None)
+    if first is None:
+        raise ValueError("No frames to render")
+    return first, itertools.chain([first], unwrapped)
+
 
-def render_from_frames(lipsynced_frames_path: str, audio_path: str, output_name: str = None):
+def render_from_frames(frames, audio_path: str, output_name: str = None, fps: int = None,
+                       stats: dict = None, profile: str = None):
     """
     Render final video from lip-synced frames and audio.
     
     Args:
-        lipsynced_frames_path: Path to .npy file containing frames
+        frames: Path to .npy frame stack, or an iterable of HxWx3 BGR frames
+                (streamed to the encoder as they arrive, never held in memory)
         audio_path: Path to audio file (wav/mp3)
         output_name: Optional name for output file
+        fps: Frame rate of the frames (default: the profile's fps)
+        stats: Optional dict, filled with encoder, profile, frames, seconds and fps
+        profile: Render profile name (default RENDER_PROFILE)
         
     Returns:
         Path to final video with audio
     """
     
-    if not os.path.exists(lipsynced_frames_path):
-        raise FileNotFoundError(f"Frames not found: {lipsynced_frames_path}")
-    
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"Audio not found: {audio_path}")
     
-    # Load frames
-    frames = np.load(lipsynced_frames_path, allow_pickle=True)
-    
-    if len(frames) == 0:
-        raise ValueError("No frames to render")
+    profile = get_profile(profile)
+    fps = fps or profile["fps"]
+    first_frame, frame_iter = _open_frames(frames)
     
     out_id = output_name or str(uuid.uuid4())
-    video_only_path = os.path.join(CACHE_DIR, f"{out_id}_video.mp4")
     final_path = os.path.join(OUTPUT_DIR, f"{out_id}.mp4")
     
-    # Get dimensions from first frame
-    first_frame = frames[0]
-    if isinstance(first_frame, dict):
-        first_frame = first_frame.get("img", first_frame)
+    started = time.perf_counter()
+    if RENDER_ENCODER == "pipe" and shutil.which("ffmpeg"):
+        out_path, frame_count = _encode_pipe(first_frame, frame_iter, audio_path, final_path, fps, profile)
+        encoder = "pipe"
+    else:
+        video_only_path = os.path.join(CACHE_DIR, f"{out_id}_video.mp4")
+        out_path, frame_count = _encode_legacy(first_frame, frame_iter, audio_path, video_only_path, final_path,
+                                               fps, profile)
+        encoder = "legacy"
+    elapsed = time.perf_counter() - started
+    
+    encode_fps = frame_count / elapsed if elapsed > 0 else 0.0
+    print(f"Encoded {frame_count} frames in {elapsed:.2f}s ({encode_fps:.1f} fps, {encoder}, {profile['name']})")
+    if stats is not None:
+        stats.update({
+            "encoder": encoder,
+            "profile": profile["name"],
+            "frames": frame_count,
+            "seconds": round(elapsed, 3),
+            "fps": round(encode_fps, 2),
+        })
+    
+    print(f"Final video rendered: {out_path}")
+    return out_path
+
+
+def _scale_filters(profile):
+    """Video filters that cap height to the profile and keep dimensions even for yuv420p"""
+    filters = []
+    if profile["max_height"]:
+        filters.append(f"scale=-2:'min(ih,{profile['max_height']})',setsar=1")
+    filters.append("pad=ceil(iw/2)*2:ceil(ih/2)*2")
+    return ",".join(filters)
+
+
+def _encode_pipe(first_frame, frame_iter, audio_path, final_path, fps, profile):
+    """
+    Single pass: raw BGR frames on stdin -> one ffmpeg encoding H.264 and
+    muxing AAC audio. Returns (final_path, frame_count).
+    """
+    
+    h, w = first_frame.shape[:2]
+    cmd = [
+        "ffmpeg", "-y",
+        "-loglevel", "error",
+        "-f", "rawvideo",
+        "-pix_fmt", "bgr24",
+        "-s", f"{w}x{h}",
+        "-r", str(fps),
+        "-i", "-",
+        "-i", audio_path,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-vf", _scale_filters(profile),
+        *video_encode_args(profile),
+        *audio_encode_args(profile),
+        "-shortest",
+        "-movflags", "+faststart",
+        final_path
+    ]
+    
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+        frame_count = 0
+        try:
+            for frame in frame_iter:
+                if frame.shape[:2] != (h, w):
+                    raise ValueError(f"Frame {frame_count} is {frame.shape[1]}x{frame.shape[0]}, expected {w}x{h}")
+                proc.stdin.write(memoryview(np.ascontiguousarray(frame, dtype=np.uint8)))
+                frame_count += 1
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        
+        returncode = proc.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"FFmpeg encode failed ({returncode}): {stderr.read().decode(errors='replace')[-2000:]}")
+    
+    return final_path, frame_count
+
+
+def _encode_legacy(first_frame, frame_iter, audio_path, video_only_path, final_path, fps,
+                   profile):
+    """
+    Two pass fallback: OpenCV mp4v intermediate, then ffmpeg re-encodes to
+    H.264 and muxes audio. Returns (path, frame_count); the path is the
+    silent intermediate if ffmpeg fails.
+    """
     
     h, w = first_frame.shape[:2]
-    fps = 25
     
     # Write frames to video
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     writer = cv2.VideoWriter(video_only_path, fourcc, fps, (w, h))
     
-    for frame in frames:
-        if isinstance(frame, dict):
-            frame = frame.get("img", frame)
+    frame_count = 0
+    for frame in frame_iter:
         if isinstance(frame, np.ndarray):
-            writer.write(frame.astype(np.uint8))
+            writer.write(np.asarray(frame, dtype=np.uint8))
+            frame_count += 1
     
     writer.release()
     print(f"Video frames written: {video_only_path}")
@@ -75,26 +198,29 @@ def render_from_frames(lipsynced_frames_path: str, audio_path: str, output_name:
         "ffmpeg", "-y",
         "-i", video_only_path,
         "-i", audio_path,
-        "-c:v", "libx264",
-        "-c:a", "aac",
-        "-b:a", "192k",
+        "-vf", _scale_filters(profile),
+        *video_encode_args(profile),
+        *audio_encode_args(profile),
         "-shortest",
         final_path
     ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("FFmpeg not found, returning video without audio")
+        return video_only_path, frame_count
     
     if result.returncode != 0:
         print(f"FFmpeg error: {result.stderr}")
         # Return video without audio as fallback
-        return video_only_path
+        return video_only_path, frame_count
     
     # Clean up intermediate file
     if os.path.exists(video_only_path) and os.path.exists(final_path):
         os.remove(video_only_path)
     
-    print(f"Final video rendered: {final_path}")
-    return final_path
+    return final_path, frame_count
 
 
 def render_final(inputs):
@@ -107,81 +233,110 @@ def render_final(inputs):
         "background_path": "/path/to/bg.mp4",  # optional
         "music_path": "/path/to/music.mp3",     # optional
         "volume": 1.0,
-        "music_volume": 0.4
+        "music_volume": 0.4,
+        "profile": "master",                    # optional render profile
+        "avatar_profile": "master"              # optional, see below
     }
+    
+    One ffmpeg run: the background composite and the voice/music mix are a
+    single filter graph, encoded once at `profile`. Without a background the
+    avatar video is stream-copied only when avatar_profile says it was
+    already encoded (by render_from_frames) at the same profile; otherwise
+    it is re-encoded like the composite.
+    
+    Returns:
+        Path to the final video; raises RuntimeError if ffmpeg fails
     """
 
-    voice = inputs.get("voice_path")
     avatar = inputs.get("avatar_path")
-    bg = inputs.get("background_path", None)
-    music = inputs.get("music_path", None)
+    if not avatar:
+        raise ValueError("No avatar_path provided")
+    for key in ("avatar_path", "voice_path", "background_path", "music_path"):
+        path = inputs.get(key)
+        if path and not os.path.exists(path):
+            raise FileNotFoundError(f"{key} not found: {path}")
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("FFmpeg not found")
 
+    profile = get_profile(inputs.get("profile"))
     out_id = str(uuid.uuid4())
-    out_path = f"{FINAL_DIR}/{out_id}.mp4"
+    out_path = os.path.join(OUTPUT_DIR, f"{out_id}.mp4")
+
+    cmd = _final_command(
+        avatar,
+        out_path,
+        voice=inputs.get("voice_path"),
+        bg=inputs.get("background_path"),
+        music=inputs.get("music_path"),
+        volume=float(inputs.get("volume", 1.0)),
+        music_volume=float(inputs.get("music_volume", 0.4)),
+        profile=profile,
+        copy_video=inputs.get("avatar_profile") == profile["name"],
+    )
+
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg final render failed ({result.returncode}): {result.stderr[-2000:]}")
+
+    print(f"Final video rendered: {out_path}")
+    return out_path
+
 
-    # ======================================================
-    # 1. BASE VIDEO (avatar only)
-    # ======================================================
-    base_video = avatar
+def _final_command(avatar, out_path, voice=None, bg=None, music=None, volume=1.0, music_volume=0.4,
+                   profile=None, copy_video=False):
+    """
+    ffmpeg command for render_final: inputs, one filter graph, one encode.
+    copy_video stream-copies the avatar when there is no background; only
+    safe when it is already H.264 at `profile`.
+    """
+    
+    profile = profile or get_profile()
+    input_args = ["-i", avatar]
+    filters = []
+    n = 1
 
-    # ======================================================
-    # 2. Optional background composite
-    # ======================================================
+    # Video: avatar scaled onto the background, the avatar as is, or the
+    # avatar re-encoded at the profile
     if bg:
-        composite_video = f"{FINAL_DIR}/{out_id}_composite.mp4"
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", bg,
-            "-i", base_video,
-            "-filter_complex", "[1:v]scale=1280:720[scaled];[0:v][scaled]overlay=0:0",
-            composite_video
-        ]
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        base_video = composite_video
-
-    # ======================================================
-    # 3. Add VOICE + optional MUSIC
-    # ======================================================
-    audio_inputs = []
-    filter_complex = []
-    map_flags = []
-
-    idx = 0
-
-    # voice
-    if voice:
-        audio_inputs.extend(["-i", voice])
-        filter_complex.append(f"[{idx}:a]volume=1.0[aud1]")
-        idx += 1
-
-    # music
-    if music:
-        audio_inputs.extend(["-i", music])
-        filter_complex.append(f"[{idx}:a]volume=0.4[aud2]")
-        idx += 1
-
-    # audio combining logic
-    if music:
-        filter_complex.append("[aud1][aud2]amix=inputs=2:dropout_transition=3[aout]")
+        input_args += ["-i", bg]
+        filters.append(
+            f"[0:v]scale=1280:720[scaled];[{n}:v][scaled]overlay=0:0,"
+            f"fps={profile['fps']},{_scale_filters(profile)}[vout]"
+        )
+        video_map, video_codec = "[vout]", video_encode_args(profile)
+        n += 1
+    elif copy_video:
+        video_map, video_codec = "0:v:0", ["-c:v", "copy"]
+    else:
+        filters.append(f"[0:v]fps={profile['fps']},{_scale_filters(profile)}[vout]")
+        video_map, video_codec = "[vout]", video_encode_args(profile)
+
+    # Audio: voice and music at their volumes, mixed when both are given
+    mixed = []
+    for path, vol in ((voice, volume), (music, music_volume)):
+        if path:
+            input_args += ["-i", path]
+            filters.append(f"[{n}:a]volume={vol}[aud{len(mixed) + 1}]")
+            mixed.append(f"[aud{len(mixed) + 1}]")
+            n += 1
+    if len(mixed) == 2:
+        filters.append(f"{mixed[0]}{mixed[1]}amix=inputs=2:dropout_transition=3[aout]")
         audio_map = "[aout]"
+    elif mixed:
+        audio_map = mixed[0]
     else:
-        audio_map = "[aud1]"
+        # No separate audio: keep the avatar's own track, if it has one
+        audio_map = "0:a?"
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", base_video,
-        *audio_inputs,
-        "-filter_complex", ";".join(filter_complex),
-        "-map", "0:v",
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", *input_args]
+    if filters:
+        cmd += ["-filter_complex", ";".join(filters)]
+    cmd += [
+        "-map", video_map,
         "-map", audio_map,
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "18",
-        "-c:a", "aac",
-        "-b:a", "192k",
+        *video_codec,
+        *audio_encode_args(profile),
+        "-movflags", "+faststart",
         out_path
     ]
-
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    return out_path
+    return cmd
@@ -0,0 +1,64 @@
+# ======================================
+# YOcreator — Render Profiles
+# pipeline/render_profiles.py
+# ======================================
+# Named quality tiers applied from lip sync through the final encode:
+#   draft     fast previews while iterating on a script
+#   standard  shareable 720p
+#   master    full resolution, the previous hard-coded settings
+#
+# A job selects one with payload["profile"]; RENDER_PROFILE sets the default.
+
+import os
+
+RENDER_PROFILES = {
+    "draft": {
+        "max_height": 480,       # frames taller than this are scaled down
+        "fps": 15,
+        "preset": "ultrafast",   # libx264
+        "crf": 30,
+        "audio_bitrate": "96k",
+        "threads": 2,            # encoder threads, 0 = ffmpeg decides
+    },
+    "standard": {
+        "max_height": 720,
+        "fps": 25,
+        "preset": "veryfast",
+        "crf": 23,
+        "audio_bitrate": "128k",
+        "threads": 0,
+    },
+    "master": {
+        "max_height": None,
+        "fps": 25,
+        "preset": "medium",
+        "crf": 18,
+        "audio_bitrate": "192k",
+        "threads": 0,
+    },
+}
+
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "master")
+
+
+def get_profile(name=None):
+    """Settings for a profile name (default RENDER_PROFILE), with "name" included"""
+    name = name or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile: {name} (expected one of {', '.join(RENDER_PROFILES)})")
+    return {"name": name, **RENDER_PROFILES[name]}
+
+
+def video_encode_args(profile):
+    """libx264 arguments for a profile"""
+    return [
+        "-c:v", "libx264",
+        "-preset", profile["preset"],
+        "-crf", str(profile["crf"]),
+        "-threads", str(profile["threads"]),
+        "-pix_fmt", "yuv420p",
+    ]
+
+
+def audio_encode_args(profile):
+    return ["-c:a", "aac", "-b:a", profile["audio_bitrate"]]
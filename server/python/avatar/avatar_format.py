@@ -0,0 +1,252 @@
+# ======================================
+# YOcreator — Avatar Data Format
+# server/python/avatar/avatar_format.py
+# ======================================
+# Versioned, columnar on-disk layout for avatar data. An avatar is a
+# directory of plain .npy arrays plus a JSON header:
+#
+#   {name}_data/
+#     header.json       format, version, shapes, per-face metadata
+#     frames.npy        uint8   [N, H, W, 3]  BGR, all resized to frame 0
+#     bboxes.npy        float32 [N, 4]        x1, y1, x2, y2
+#     landmarks.npy     float32 [N, L, 2]     L = 0 when unavailable
+#     embeddings.npy    float32 [N, D]        D = 0 when unavailable
+#     roi_affines.npy   float32 [N, 2, 3]     frame -> face ROI (v2+)
+#
+# Nothing is pickled, and readers can memory-map frames.npy and touch only
+# the frames they use. Legacy {name}_data.npy pickles are still readable.
+
+import os
+import json
+import shutil
+import cv2
+import numpy as np
+
+try:
+    from .face_roi import ROI_SIZE, roi_affines as compute_roi_affines
+except ImportError:
+    from face_roi import ROI_SIZE, roi_affines as compute_roi_affines
+
+FORMAT_NAME = "yocreator-avatar"
+FORMAT_VERSION = 2
+
+HEADER_FILE = "header.json"
+
+
+def write_avatar_data(path: str, faces, backend: str = "unknown"):
+    """
+    Write faces (dicts from create_avatar) to `path` in the columnar format.
+
+    Every frame is resized to the first face's resolution so the stack is one
+    contiguous array; bboxes and landmarks are scaled to match. The directory
+    is built next to `path` and renamed into place, so readers never see a
+    partial avatar.
+    """
+    if len(faces) == 0:
+        raise ValueError("No faces to write")
+
+    h, w = faces[0]["img"].shape[:2]
+    n = len(faces)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    frames = np.lib.format.open_memmap(
+        os.path.join(tmp_path, "frames.npy"), mode="w+", dtype=np.uint8, shape=(n, h, w, 3)
+    )
+    bboxes, landmarks, embeddings, source_sizes = _fill_columns(faces, frames)
+
+    frames.flush()
+    del frames
+
+    np.save(os.path.join(tmp_path, "bboxes.npy"), bboxes)
+    np.save(os.path.join(tmp_path, "landmarks.npy"), landmarks)
+    np.save(os.path.join(tmp_path, "embeddings.npy"), embeddings)
+    np.save(os.path.join(tmp_path, "roi_affines.npy"), compute_roi_affines(bboxes, (h, w), ROI_SIZE))
+
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "backend": backend,
+        "count": n,
+        "height": h,
+        "width": w,
+        "landmark_count": landmarks.shape[1],
+        "embedding_dim": embeddings.shape[1],
+        "roi_size": ROI_SIZE,
+        "img_paths": [f.get("img_path") for f in faces],
+        "source_sizes": source_sizes,
+        "ages": [f.get("age") for f in faces],
+        "genders": [_json_scalar(f.get("gender")) for f in faces],
+    }
+    with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+        json.dump(header, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _fill_columns(faces, frames):
+    """
+    Copy face images into the preallocated `frames` stack (resizing to its
+    resolution) and build the typed per-face columns.
+    """
+    n, h, w = frames.shape[:3]
+    landmark_count = max((len(f.get("landmarks") or []) for f in faces), default=0)
+    embedding_dim = max((len(f.get("embedding") or []) for f in faces), default=0)
+
+    bboxes = np.zeros((n, 4), dtype=np.float32)
+    landmarks = np.full((n, landmark_count, 2), np.nan, dtype=np.float32)
+    embeddings = np.zeros((n, embedding_dim), dtype=np.float32)
+    source_sizes = []
+
+    for i, face in enumerate(faces):
+        img = face["img"]
+        src_h, src_w = img.shape[:2]
+        source_sizes.append([src_h, src_w])
+        sx, sy = w / src_w, h / src_h
+
+        frames[i] = img if (src_h, src_w) == (h, w) else cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+        bboxes[i] = np.asarray(face["bbox"], dtype=np.float32) * (sx, sy, sx, sy)
+
+        pts = np.asarray(face.get("landmarks") or [], dtype=np.float32).reshape(-1, 2)
+        if len(pts):
+            landmarks[i, :len(pts)] = pts * (sx, sy)
+
+        emb = np.asarray(face.get("embedding") or [], dtype=np.float32)
+        embeddings[i, :len(emb)] = emb
+
+    return bboxes, landmarks, embeddings, source_sizes
+
+
+def _json_scalar(value):
+    """numpy scalars (e.g. InsightFace gender) -> plain Python"""
+    return value.item() if hasattr(value, "item") else value
+
+
+class AvatarData:
+    """
+    Columnar view of an avatar; `frames` may be a read-only memmap.
+
+    Avatars written before v2 have no stored ROI; it is derived from the
+    bboxes on load.
+    """
+
+    def __init__(self, header, frames, bboxes, landmarks, embeddings, roi_affines=None):
+        self.header = header
+        self.frames = frames
+        self.bboxes = bboxes
+        self.landmarks = landmarks
+        self.embeddings = embeddings
+        self.roi_size = header.get("roi_size", ROI_SIZE)
+        if roi_affines is None:
+            roi_affines = compute_roi_affines(bboxes, self.frame_size, self.roi_size)
+        self.roi_affines = roi_affines
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def frame_size(self):
+        """(height, width) shared by every frame"""
+        return self.frames.shape[1], self.frames.shape[2]
+
+    def scaled(self, max_height: int):
+        """
+        Copy with frames (and bboxes, landmarks, ROI) scaled down to at most
+        max_height, keeping aspect and even dimensions; self if already fits.
+        """
+        h, w = self.frame_size
+        if not max_height or h <= max_height:
+            return self
+
+        new_h = int(max_height) // 2 * 2
+        new_w = int(round(w * new_h / h)) // 2 * 2
+        sx, sy = new_w / w, new_h / h
+
+        frames = np.empty((len(self), new_h, new_w, 3), dtype=np.uint8)
+        for i in range(len(self)):
+            frames[i] = cv2.resize(np.asarray(self.frames[i]), (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+        # frame -> ROI affines take scaled frame coordinates
+        rois = self.roi_affines.copy()
+        rois[:, :, 0] /= sx
+        rois[:, :, 1] /= sy
+
+        header = {**self.header, "height": new_h, "width": new_w}
+        return AvatarData(
+            header,
+            frames,
+            self.bboxes * np.float32((sx, sy, sx, sy)),
+            self.landmarks * np.float32((sx, sy)),
+            self.embeddings,
+            rois,
+        )
+
+    def face(self, idx: int):
+        """One face as the legacy dict shape ({"img", "bbox", "landmarks", ...})"""
+        lm = self.landmarks[idx]
+        return {
+            "img": self.frames[idx],
+            "img_path": self.header.get("img_paths", [None] * len(self))[idx],
+            "bbox": self.bboxes[idx].tolist(),
+            "landmarks": lm[~np.isnan(lm).any(axis=1)].tolist(),
+            "embedding": self.embeddings[idx].tolist(),
+        }
+
+
+def is_avatar_dir(path: str):
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def load_avatar_data(path: str, mmap: bool = True):
+    """
+    Open avatar data written by create_avatar.
+
+    Accepts a format directory or a legacy pickled {name}_data.npy. With
+    mmap=True frames are memory-mapped read-only instead of loaded.
+    """
+    if is_avatar_dir(path):
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header.get("format") != FORMAT_NAME or header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Unsupported avatar format in {path}: {header.get('format')} v{header.get('version')}")
+
+        mode = "r" if mmap else None
+        roi_path = os.path.join(path, "roi_affines.npy")
+        return AvatarData(
+            header,
+            np.load(os.path.join(path, "frames.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "bboxes.npy")),
+            np.load(os.path.join(path, "landmarks.npy")),
+            np.load(os.path.join(path, "embeddings.npy")),
+            np.load(roi_path) if os.path.exists(roi_path) else None,
+        )
+
+    if os.path.isfile(path) and path.endswith(".npy"):
+        return _load_legacy(path)
+
+    raise FileNotFoundError(f"Avatar data not found: {path}")
+
+
+def _load_legacy(path: str):
+    """Convert a legacy pickled list of face dicts into columnar arrays in memory"""
+    faces = list(np.load(path, allow_pickle=True))
+    if not faces:
+        raise ValueError(f"No frames in avatar data: {path}")
+
+    h, w = faces[0]["img"].shape[:2]
+    frames = np.empty((len(faces), h, w, 3), dtype=np.uint8)
+    bboxes, landmarks, embeddings, _ = _fill_columns(faces, frames)
+
+    header = {
+        "format": FORMAT_NAME,
+        "version": 0,
+        "count": len(faces),
+        "height": h,
+        "width": w,
+        "img_paths": [f.get("img_path") for f in faces],
+    }
+    return AvatarData(header, frames, bboxes, landmarks, embeddings)
@@ -5,65 +5,306 @@
 # Extracts face mesh from photos and prepares avatar data for lip-sync
 
 import os
+import sys
+import json
+import shutil
+import uuid
+import hashlib
+import importlib.util
+import importlib.metadata
 import cv2
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.model_registry import registry
+from common.disk_cache import DiskCache, make_key
+
 try:
-    from insightface.app import FaceAnalysis
-    INSIGHTFACE_AVAILABLE = True
+    from .avatar_format import write_avatar_data, FORMAT_VERSION, HEADER_FILE
 except ImportError:
-    INSIGHTFACE_AVAILABLE = False
+    from avatar_format import write_avatar_data, FORMAT_VERSION, HEADER_FILE
+
+# insightface (and onnxruntime behind it) is only imported when the detector
+# is first built, so cache hits and Haar-only hosts never pay for it
+INSIGHTFACE_AVAILABLE = importlib.util.find_spec("insightface") is not None
+if not INSIGHTFACE_AVAILABLE:
     print("Warning: InsightFace not installed. Using fallback face detection.")
 
 AVATAR_OUT = os.path.join(os.path.dirname(__file__), "../../../pipeline/cache/avatar")
 Path(AVATAR_OUT).mkdir(parents=True, exist_ok=True)
 
 
-def create_avatar(image_dir: str, output_name: str = "avatar"):
+# InsightFace model pack (FaceAnalysis default); part of the cache key
+INSIGHTFACE_MODEL = os.getenv("INSIGHTFACE_MODEL", "buffalo_l")
+
+
+def _load_face_analysis():
+    """Build and prepare the InsightFace detector/recognizer (slow, once per process)"""
+    from insightface.app import FaceAnalysis
+    app = FaceAnalysis(name=INSIGHTFACE_MODEL, providers=['CPUExecutionProvider', 'CUDAExecutionProvider'])
+    app.prepare(ctx_id=0)
+    return app
+
+
+if INSIGHTFACE_AVAILABLE:
+    registry.register("insightface", _load_face_analysis)
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Threads decoding photos ahead of detection (cv2.imread releases the GIL);
+# 1 disables the pipeline and decodes inline. Detection runs one image at a
+# time: neither detector has a batched call.
+DECODE_WORKERS = max(1, int(os.getenv("AVATAR_DECODE_WORKERS", "4")))
+
+# Avatars already built from the same photo set, keyed by content hash.
+# Bump AVATAR_MODEL_VERSION to invalidate entries after changing detector
+# weights that the library version does not capture.
+AVATAR_MODEL_VERSION = os.getenv("AVATAR_MODEL_VERSION", "1")
+AVATAR_CACHE = DiskCache(
+    os.path.join(AVATAR_OUT, "by_hash"),
+    max_bytes=int(float(os.getenv("AVATAR_CACHE_MAX_MB", "4096")) * 1024 * 1024),
+    name="avatar",
+)
+CACHE_DATA_NAME = "avatar_data"
+CACHE_REFERENCE_NAME = "avatar_reference.jpg"
+TMP_SUFFIX = ".tmp"
+
+
+def create_avatar(image_dir: str, output_name: str = None,
+                  workers: int = None, cancel_event=None,
+                  use_cache: bool = True):
     """
     Process multiple face images to create avatar data.
     
     Args:
         image_dir: Directory containing 10-20 face photos
-        output_name: Name for the output avatar data file
+        output_name: Optional name; when given, the result is also
+                     published as AVATAR_OUT/{output_name}_data (replacing
+                     any earlier avatar of that name). Without it the
+                     result points into the read-only cache entry, so
+                     concurrent jobs never share a mutable path.
+        workers: Decode threads (default AVATAR_DECODE_WORKERS, 1 = sequential)
+        cancel_event: Optional threading.Event; when set, stops after the
+                      current image and returns an error
+        use_cache: Reuse avatar data built earlier from identical photos
         
     Returns:
         dict with success status and output path
     """
     
+    workers = workers or DECODE_WORKERS
+    paths = _list_images(image_dir)
+
     if INSIGHTFACE_AVAILABLE:
-        return _create_avatar_insightface(image_dir, output_name)
+        backend, build = "insightface", _create_avatar_insightface
     else:
-        return _create_avatar_fallback(image_dir, output_name)
+        backend, build = "haar", _create_avatar_fallback
+
+    if not use_cache:
+        name = output_name or f"avatar_{uuid.uuid4().hex[:12]}"
+        return build(paths, AVATAR_OUT, name, workers, cancel_event)
+
+    key = avatar_cache_key(paths, backend)
+    cached = AVATAR_CACHE.get(key)
+    if cached:
+        result = _cached_result(cached)
+        return _named_result(result, output_name) if output_name else result
+
+    # Built inside the cache entry's temp dir and published atomically;
+    # a failed build raises out of the producer so nothing is cached
+    result = {}
+
+    def build_entry(tmp_dir):
+        os.makedirs(tmp_dir)
+        result.update(build(paths, tmp_dir, "avatar", workers, cancel_event))
+        if not result.get("success"):
+            raise _BuildFailed()
+
+    try:
+        entry = AVATAR_CACHE.put(key, build_entry)
+    except _BuildFailed:
+        return result
+
+    result["output"] = os.path.join(entry, CACHE_DATA_NAME)
+    result["reference"] = os.path.join(entry, CACHE_REFERENCE_NAME)
+    result["cache_entry"] = entry
+    result["cached"] = False
+    return _named_result(result, output_name) if output_name else result
+
+
+class _BuildFailed(Exception):
+    """Raised inside the cache producer when detection returned an error"""
+
+
+def avatar_model_version(backend: str):
+    """Everything about the detector that changes its output"""
+    if backend == "insightface":
+        try:
+            version = importlib.metadata.version("insightface")
+        except importlib.metadata.PackageNotFoundError:
+            version = "?"
+        return f"insightface-{version}-{INSIGHTFACE_MODEL}-{AVATAR_MODEL_VERSION}"
+    return f"haar-opencv-{cv2.__version__}-{AVATAR_MODEL_VERSION}"
+
+
+def avatar_cache_key(paths, backend: str):
+    """Hash of the photos' bytes (in sorted filename order), detector and data format"""
+    digests = []
+    for path in paths:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        digests.append(h.hexdigest())
+    return make_key("avatar", digests, backend, avatar_model_version(backend), FORMAT_VERSION)
+
+
+def _cached_result(entry: str):
+    data_path = os.path.join(entry, CACHE_DATA_NAME)
+    with open(os.path.join(data_path, HEADER_FILE)) as f:
+        count = json.load(f).get("count")
+    print(f"Avatar cache hit: {os.path.basename(entry)[:12]}")
+    return {
+        "success": True,
+        "message": f"Avatar loaded from cache ({count} faces)",
+        "output": data_path,
+        "reference": os.path.join(entry, CACHE_REFERENCE_NAME),
+        "face_count": count,
+        "cache_entry": entry,
+        "cached": True,
+    }
+
+
+def _link_or_copy(src, dst):
+    """Hard link (no copy, survives cache eviction); copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _named_result(result: dict, output_name: str):
+    """
+    Publish a cache entry's files under AVATAR_OUT/{output_name}_* and point
+    the result at them, so callers that look avatars up by name find them.
+    """
+    data_path = os.path.join(AVATAR_OUT, f"{output_name}_data")
+    reference_path = os.path.join(AVATAR_OUT, f"{output_name}_reference.jpg")
+
+    tmp_data = f"{data_path}{TMP_SUFFIX}"
+    shutil.rmtree(tmp_data, ignore_errors=True)
+    shutil.copytree(result["output"], tmp_data, copy_function=_link_or_copy)
+    if os.path.isdir(data_path):
+        shutil.rmtree(data_path)
+    os.replace(tmp_data, data_path)
+
+    # Not os.replace: renaming onto another link of the same file is a no-op
+    if os.path.exists(reference_path):
+        os.remove(reference_path)
+    _link_or_copy(result["reference"], reference_path)
+
+    result["cache_entry"] = os.path.dirname(result["output"])
+    result["output"] = data_path
+    result["reference"] = reference_path
+    return result
+
+
+def avatar_cache_stats():
+    return AVATAR_CACHE.stats()
+
+
+def _list_images(image_dir: str):
+    """Photo paths in sorted order, so results are deterministic"""
+    return [
+        os.path.join(image_dir, name)
+        for name in sorted(os.listdir(image_dir))
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def _iter_decoded(paths, workers: int):
+    """
+    Yield (path, img) in input order.
+
+    With workers > 1 a thread pool decodes ahead of the consumer, keeping at
+    most 2 * workers images in flight, so detection on one image overlaps
+    decoding of the next. img is None for unreadable files.
+    """
+    if workers <= 1:
+        for p in paths:
+            yield p, cv2.imread(p)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        remaining = iter(paths)
+        in_flight = deque(
+            (p, pool.submit(cv2.imread, p))
+            for p in islice(remaining, 2 * workers)
+        )
+        while in_flight:
+            path, future = in_flight.popleft()
+            nxt = next(remaining, None)
+            if nxt is not None:
+                in_flight.append((nxt, pool.submit(cv2.imread, nxt)))
+            yield path, future.result()
+
+
+def _detect_insightface(app, img):
+    """First detected face, or None"""
+    found = app.get(img)
+    return found[0] if len(found) else None
+
+
+def _detect_haar(cascade, img):
+    """First Haar detection (x, y, w, h), or None"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    detected = cascade.detectMultiScale(gray, 1.1, 4)
+    return detected[0] if len(detected) else None
+
+
+def _save_avatar(faces, out_dir: str, output_name: str, backend: str):
+    """Write avatar data (columnar format) and reference frame, return their paths"""
+    avatar_data_path = os.path.join(out_dir, f"{output_name}_data")
+    write_avatar_data(avatar_data_path, faces, backend=backend)
 
+    # Save reference frame (first good face)
+    reference_path = os.path.join(out_dir, f"{output_name}_reference.jpg")
+    cv2.imwrite(reference_path, faces[0]["img"])
+
+    return avatar_data_path, reference_path
 
-def _create_avatar_insightface(image_dir: str, output_name: str):
+
+def _create_avatar_insightface(paths, out_dir: str, output_name: str, workers: int = 1, cancel_event=None):
     """Use InsightFace for high-quality face mesh extraction"""
     
-    app = FaceAnalysis(providers=['CPUExecutionProvider', 'CUDAExecutionProvider'])
-    app.prepare(ctx_id=0)
+    app = registry.get("insightface")
 
     faces = []
     processed = 0
     
-    for img_name in os.listdir(image_dir):
-        if not img_name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-            continue
-            
-        img_path = os.path.join(image_dir, img_name)
-        img = cv2.imread(img_path)
-        
+    for img_path, img in _iter_decoded(paths, workers):
+        if cancel_event is not None and cancel_event.is_set():
+            return {"success": False, "error": "Avatar creation cancelled"}
+
         if img is None:
             print(f"Warning: Could not read {img_path}")
             continue
 
-        results = app.get(img)
-        if len(results) == 0:
+        img_name = os.path.basename(img_path)
+        face = _detect_insightface(app, img)
+        if face is None:
             print(f"Warning: No face detected in {img_name}")
             continue
 
-        face = results[0]
         faces.append({
             "img": img,
             "img_path": img_path,
@@ -82,13 +323,7 @@ def _create_avatar_insightface(image_dir: str, output_name: str):
             "error": "No faces detected in any images"
         }
 
-    # Save avatar data
-    avatar_data_path = os.path.join(AVATAR_OUT, f"{output_name}_data.npy")
-    np.save(avatar_data_path, faces, allow_pickle=True)
-
-    # Save reference frame (first good face)
-    reference_path = os.path.join(AVATAR_OUT, f"{output_name}_reference.jpg")
-    cv2.imwrite(reference_path, faces[0]["img"])
+    avatar_data_path, reference_path = _save_avatar(faces, out_dir, output_name, "insightface")
 
     return {
         "success": True,
@@ -99,7 +334,7 @@ def _create_avatar_insightface(image_dir: str, output_name: str):
     }
 
 
-def _create_avatar_fallback(image_dir: str, output_name: str):
+def _create_avatar_fallback(paths, out_dir: str, output_name: str, workers: int = 1, cancel_event=None):
     """Fallback using OpenCV Haar cascades"""
     
     face_cascade = cv2.CascadeClassifier(
@@ -107,32 +342,24 @@ def _create_avatar_fallback(image_dir: str, output_name: str):
     )
     
     faces = []
-    processed = 0
     
-    for img_name in os.listdir(image_dir):
-        if not img_name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-            continue
-            
-        img_path = os.path.join(image_dir, img_name)
-        img = cv2.imread(img_path)
-        
+    for img_path, img in _iter_decoded(paths, workers):
+        if cancel_event is not None and cancel_event.is_set():
+            return {"success": False, "error": "Avatar creation cancelled"}
         if img is None:
             continue
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        detected = face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        if len(detected) == 0:
+        found = _detect_haar(face_cascade, img)
+        if found is None:
             continue
 
-        x, y, w, h = detected[0]
+        x, y, w, h = found
         faces.append({
             "img": img,
             "img_path": img_path,
             "bbox": [x, y, x+w, y+h],
             "landmarks": [],  # Not available with Haar
         })
-        processed += 1
 
     if len(faces) == 0:
         return {
@@ -140,11 +367,7 @@ def _create_avatar_fallback(image_dir: str, output_name: str):
             "error": "No faces detected"
         }
 
-    avatar_data_path = os.path.join(AVATAR_OUT, f"{output_name}_data.npy")
-    np.save(avatar_data_path, faces, allow_pickle=True)
-
-    reference_path = os.path.join(AVATAR_OUT, f"{output_name}_reference.jpg")
-    cv2.imwrite(reference_path, faces[0]["img"])
+    avatar_data_path, reference_path = _save_avatar(faces, out_dir, output_name, "haar")
 
     return {
         "success": True,
@@ -0,0 +1,99 @@
+# ======================================
+# YOcreator — Face ROI Crop & Paste-Back
+# server/python/avatar/face_roi.py
+# ======================================
+# Lip sync only needs the face. Each avatar photo gets a square, padded
+# face crop described by an affine transform (frame -> ROI), computed once
+# when the avatar is created. Lip sync warps just that ROI to a fixed size,
+# works on it, and blends the result back into the frame with a feathered
+# mask so the seam does not show.
+
+import os
+import cv2
+import numpy as np
+
+# Side of the square ROI in pixels; matches the Wav2Lip input size so the
+# crop can be fed to the model without another resize
+ROI_SIZE = max(16, int(os.getenv("AVATAR_ROI_SIZE", "96")))
+
+# Extra margin around the detected face, as a fraction of its larger side
+ROI_PAD = 0.15
+# Shift the ROI down by this fraction of the face height to keep the chin
+ROI_CHIN_SHIFT = 0.05
+
+# Width of the blend ramp at the ROI border, as a fraction of ROI_SIZE
+FEATHER = 0.12
+
+
+def roi_affines(bboxes, frame_size, roi_size=ROI_SIZE):
+    """
+    [N, 2, 3] float32 frame -> ROI affine per face (uniform scale + shift).
+
+    Faces without a usable bbox map the whole frame onto the ROI.
+    """
+    h, w = frame_size
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    x1, y1, x2, y2 = bboxes.T
+    bw, bh = x2 - x1, y2 - y1
+
+    side = np.maximum(bw, bh) * (1 + 2 * ROI_PAD)
+    cx = (x1 + x2) / 2
+    cy = (y1 + y2) / 2 + ROI_CHIN_SHIFT * bh
+    scale = roi_size / np.maximum(side, 1e-6)
+
+    affines = np.zeros((len(bboxes), 2, 3), dtype=np.float64)
+    affines[:, 0, 0] = scale
+    affines[:, 1, 1] = scale
+    affines[:, 0, 2] = -(cx - side / 2) * scale
+    affines[:, 1, 2] = -(cy - side / 2) * scale
+
+    empty = ~np.isfinite(bboxes).all(axis=1) | (bw < 2) | (bh < 2)
+    affines[empty] = [[roi_size / w, 0, 0], [0, roi_size / h, 0]]
+    return affines.astype(np.float32)
+
+
+def crop_roi(frame, affine, roi_size=ROI_SIZE):
+    """Warp the face ROI out of a frame -> [roi_size, roi_size, 3]"""
+    return cv2.warpAffine(
+        np.asarray(frame), affine, (roi_size, roi_size),
+        flags=cv2.INTER_AREA, borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
+def feather_mask(roi_size=ROI_SIZE, feather=FEATHER):
+    """[roi_size, roi_size] float32 blend weights: 1 inside, ramping to 0 at the border"""
+    ramp = max(1.0, feather * roi_size)
+    d = np.minimum(np.arange(roi_size), np.arange(roi_size)[::-1]) + 0.5
+    edge = np.clip(d / ramp, 0, 1).astype(np.float32)
+    return np.minimum(edge[:, None], edge[None, :])
+
+
+def paste_roi(frame, roi, affine, mask):
+    """
+    Blend a processed ROI back into a copy of `frame`.
+
+    Only the frame rectangle the ROI covers is warped and blended; the rest
+    of the frame is copied untouched.
+    """
+    out = np.array(frame)
+    h, w = out.shape[:2]
+    size = roi.shape[0]
+
+    inv = cv2.invertAffineTransform(np.asarray(affine, dtype=np.float64))
+    corners = inv @ np.array([[0, 0, 1], [size, size, 1]], dtype=np.float64).T
+    x0, y0 = np.floor(corners.min(axis=1)).astype(int)
+    x1, y1 = np.ceil(corners.max(axis=1)).astype(int)
+    x0, y0, x1, y1 = max(x0, 0), max(y0, 0), min(x1, w), min(y1, h)
+    if x1 <= x0 or y1 <= y0:
+        return out
+
+    # ROI -> frame, shifted so the target rectangle starts at (0, 0)
+    inv[:, 2] -= (x0, y0)
+    region = (x1 - x0, y1 - y0)
+    warped = cv2.warpAffine(roi, inv, region, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    alpha = cv2.warpAffine(mask, inv, region, flags=cv2.INTER_LINEAR, borderValue=0)[..., None]
+
+    target = out[y0:y1, x0:x1].astype(np.float32)
+    target += alpha * (warped.astype(np.float32) - target)
+    out[y0:y1, x0:x1] = np.clip(target + 0.5, 0, 255).astype(np.uint8)
+    return out
@@ -5,68 +5,94 @@
 # Wav2Lip-based lip synchronization for avatar videos
 
 import os
-import torch
+import sys
 import numpy as np
 import cv2
 from pathlib import Path
 from scipy.io import wavfile
 
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.model_registry import registry
+
+try:
+    from .avatar_format import load_avatar_data
+    from .wav2lip_engine import Wav2LipEngine, resolve_device
+except ImportError:
+    from avatar_format import load_avatar_data
+    from wav2lip_engine import Wav2LipEngine, resolve_device
+
 CACHE = os.path.join(os.path.dirname(__file__), "../../../pipeline/cache/lipsync")
 Path(CACHE).mkdir(parents=True, exist_ok=True)
 
-# Check for Wav2Lip availability
-WAV2LIP_AVAILABLE = False
-try:
-    # This would be the actual Wav2Lip model import
-    # from models.wav2lip import Wav2Lip
-    WAV2LIP_AVAILABLE = os.path.exists("models/wav2lip.pth")
-except:
-    pass
+# Wav2Lip checkpoint; the model code (models/wav2lip.py from the Wav2Lip
+# repo) must be importable as `models.wav2lip`
+WAV2LIP_CHECKPOINT = os.getenv("WAV2LIP_CHECKPOINT", "models/wav2lip.pth")
+WAV2LIP_AVAILABLE = os.path.exists(WAV2LIP_CHECKPOINT)
 
 
 def load_wav2lip_model():
-    """Load the Wav2Lip model for lip sync"""
-    model_path = "models/wav2lip.pth"
+    """Load the Wav2Lip model onto LIPSYNC_DEVICE for lip sync"""
+    import torch
     
-    if not os.path.exists(model_path):
+    if not os.path.exists(WAV2LIP_CHECKPOINT):
         raise FileNotFoundError(
-            f"Wav2Lip model not found at {model_path}. "
+            f"Wav2Lip model not found at {WAV2LIP_CHECKPOINT}. "
             "Download from: https://github.com/Rudrabha/Wav2Lip"
         )
+    from models.wav2lip import Wav2Lip
     
-    # Placeholder for actual model loading
-    # model = Wav2Lip()
-    # model.load_state_dict(torch.load(model_path, map_location="cuda"))
-    # model.cuda().eval()
-    # return model
+    device = resolve_device()
+    checkpoint = torch.load(WAV2LIP_CHECKPOINT, map_location=device)
+    state = checkpoint.get("state_dict", checkpoint)
+    # Checkpoints saved from DataParallel prefix every key with "module."
+    state = {k.replace("module.", "", 1): v for k, v in state.items()}
     
-    return None  # Placeholder
+    model = Wav2Lip()
+    model.load_state_dict(state)
+    return model.to(device).eval()
 
 
-def lipsync_avatar(avatar_data_path: str, audio_path: str, output_name: str = "lipsynced"):
-    """
-    Apply lip sync to avatar frames using audio.
+def _unload_wav2lip_model(model):
+    """Release GPU memory held by the Wav2Lip model"""
+    import torch
     
-    Args:
-        avatar_data_path: Path to avatar_data.npy from create_avatar
-        audio_path: Path to audio WAV file
-        output_name: Name for output file
-        
-    Returns:
-        dict with success status and output path
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+registry.register("wav2lip", load_wav2lip_model, _unload_wav2lip_model)
+
+
+# Frames produced per step when streaming; bounds lipsync memory to one chunk
+STREAM_CHUNK_FRAMES = max(1, int(os.getenv("LIPSYNC_CHUNK_FRAMES", "32")))
+
+# Also write streamed frames to pipeline/cache/lipsync (debugging only)
+DEBUG_DUMP = os.getenv("LIPSYNC_DEBUG_DUMP", "") == "1"
+
+
+def _open_inputs(avatar_data_path: str, audio_path: str, fps: int, max_height: int = None):
+    """
+    Load avatar (scaled to max_height, if given) + audio; returns
+    (avatar, audio_sr, audio_data, num_frames) or an error dict
     """
     
-    # Load avatar data
     if not os.path.exists(avatar_data_path):
         return {"success": False, "error": "Avatar data not found"}
         
     if not os.path.exists(audio_path):
         return {"success": False, "error": "Audio file not found"}
     
-    frames = np.load(avatar_data_path, allow_pickle=True)
+    try:
+        avatar = load_avatar_data(avatar_data_path)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
     
-    if len(frames) == 0:
+    if len(avatar) == 0:
         return {"success": False, "error": "No frames in avatar data"}
+    avatar = avatar.scaled(max_height)
     
     # Load audio
     try:
@@ -74,116 +100,207 @@ def lipsync_avatar(avatar_data_path: str, audio_path: str, output_name: str = "l
     except Exception as e:
         return {"success": False, "error": f"Failed to read audio: {str(e)}"}
     
-    fps = 25
     duration = len(audio_data) / audio_sr
     num_frames = int(duration * fps)
     
-    print(f"Processing {num_frames} frames for {duration:.2f}s of audio")
+    if num_frames == 0:
+        return {"success": False, "error": "Audio too short to lip sync"}
     
-    # If Wav2Lip is available, use it
-    if WAV2LIP_AVAILABLE:
-        return _lipsync_wav2lip(frames, audio_data, audio_sr, fps, output_name)
-    else:
-        # Fallback: simple frame duplication with visual feedback
-        return _lipsync_fallback(frames, audio_data, audio_sr, fps, output_name)
+    print(f"Processing {num_frames} frames for {duration:.2f}s of audio")
+    return avatar, audio_sr, audio_data, num_frames
 
 
-def _lipsync_wav2lip(frames, audio_data, audio_sr, fps, output_name):
-    """Full Wav2Lip lip sync processing"""
+def lipsync_stream(avatar_data_path: str, audio_path: str, output_name: str = "lipsynced",
+                   fps: int = 25, debug_dump: bool = None, max_height: int = None):
+    """
+    Lip sync as a frame generator, for piping straight into an encoder.
     
-    model = load_wav2lip_model()
-    out_frames = []
+    Frames are produced STREAM_CHUNK_FRAMES at a time, so memory stays at one
+    chunk regardless of video length. Nothing is written to disk unless
+    debug_dump (default LIPSYNC_DEBUG_DUMP=1) is set. fps and max_height
+    come from the job's render profile; frames taller than max_height are
+    produced at the scaled-down size.
     
-    num_frames = int(len(audio_data) / audio_sr * fps)
+    Returns:
+        dict with success status, "frames" (iterator of HxWx3 uint8 BGR),
+        "num_frames", "fps", "size" (h, w) and "mode"
+    """
     
-    for idx in range(num_frames):
-        # Get frame (cycle through available frames)
-        frame_data = frames[idx % len(frames)]
-        frame = frame_data["img"]
-        
-        # Get audio slice for this frame
-        start_sample = int(idx * audio_sr / fps)
-        end_sample = int((idx + 1) * audio_sr / fps)
-        audio_slice = audio_data[start_sample:end_sample]
-        
-        # Convert to tensors
-        frame_tensor = torch.from_numpy(frame).permute(2, 0, 1).unsqueeze(0).float().cuda()
-        audio_tensor = torch.from_numpy(audio_slice.astype(np.float32)).unsqueeze(0).cuda()
-        
-        # Run Wav2Lip inference
-        # out = model(frame_tensor, audio_tensor)
-        # out_frame = out[0].cpu().detach().numpy().transpose(1, 2, 0)
-        
-        out_frames.append(frame)  # Placeholder
-        
-        if idx % 50 == 0:
-            print(f"Processed frame {idx}/{num_frames}")
+    opened = _open_inputs(avatar_data_path, audio_path, fps, max_height)
+    if isinstance(opened, dict):
+        return opened
+    avatar, audio_sr, audio_data, num_frames = opened
     
-    out_path = os.path.join(CACHE, f"{output_name}.npy")
-    np.save(out_path, out_frames, allow_pickle=True)
+    if WAV2LIP_AVAILABLE:
+        frames, mode = _iter_wav2lip(avatar, audio_data, audio_sr, fps, num_frames), "wav2lip"
+    else:
+        frames, mode = _iter_fallback(avatar, audio_data, audio_sr, fps, num_frames), "fallback"
+    
+    if DEBUG_DUMP if debug_dump is None else debug_dump:
+        frames = _tee_to_disk(frames, os.path.join(CACHE, f"{output_name}.npy"), num_frames, avatar.frame_size)
     
     return {
         "success": True,
-        "output": out_path,
-        "frames": num_frames
+        "frames": frames,
+        "num_frames": num_frames,
+        "fps": fps,
+        "size": avatar.frame_size,
+        "mode": mode
     }
 
 
-def _lipsync_fallback(frames, audio_data, audio_sr, fps, output_name):
-    """
-    Fallback lip sync - creates video frames synced to audio duration.
-    Adds visual cues based on audio amplitude.
+def lipsync_avatar(avatar_data_path: str, audio_path: str, output_name: str = "lipsynced",
+                   fps: int = 25, max_height: int = None):
     """
+    Apply lip sync to avatar frames using audio.
     
-    num_frames = int(len(audio_data) / audio_sr * fps)
-    out_frames = []
+    Consumes lipsync_stream() into a frame stack on disk. Prefer passing
+    lipsync_stream()["frames"] to render_from_frames when the frames are
+    only needed for encoding.
     
-    # Calculate audio energy per frame for visual feedback
-    samples_per_frame = audio_sr // fps
-    
-    for idx in range(num_frames):
-        # Cycle through available face frames
-        frame_data = frames[idx % len(frames)]
-        frame = frame_data["img"].copy()
-        
-        # Get audio amplitude for this frame
-        start = idx * samples_per_frame
-        end = start + samples_per_frame
-        audio_slice = audio_data[start:end] if end <= len(audio_data) else audio_data[start:]
-        
-        if len(audio_slice) > 0:
-            amplitude = np.abs(audio_slice).mean()
-            # Normalize amplitude
-            if audio_data.dtype == np.int16:
-                amplitude = amplitude / 32768.0
-            
-            # Add visual indicator of speech (simple overlay)
-            if amplitude > 0.02:  # Speaking threshold
-                # Draw a subtle "speaking" indicator
-                h, w = frame.shape[:2]
-                intensity = min(int(amplitude * 255 * 3), 255)
-                cv2.circle(frame, (w - 30, h - 30), 10, (0, intensity, 0), -1)
-        
-        out_frames.append(frame)
+    Args:
+        avatar_data_path: Avatar data from create_avatar (format directory or legacy .npy)
+        audio_path: Path to audio WAV file
+        output_name: Name for output file
+        fps: Output frame rate
+        max_height: Scale frames down to this height (render profile cap)
         
-        if idx % 100 == 0:
-            print(f"Processed frame {idx}/{num_frames}")
+    Returns:
+        dict with success status and output path
+    """
+    
+    stream = lipsync_stream(avatar_data_path, audio_path, output_name, fps=fps,
+                            debug_dump=False, max_height=max_height)
+    if not stream.get("success"):
+        return stream
     
     out_path = os.path.join(CACHE, f"{output_name}.npy")
-    np.save(out_path, out_frames, allow_pickle=True)
+    for _ in _tee_to_disk(stream["frames"], out_path, stream["num_frames"], stream["size"]):
+        pass
     
     return {
         "success": True,
         "output": out_path,
-        "frames": num_frames,
-        "mode": "fallback"
+        "frames": stream["num_frames"],
+        "fps": fps,
+        "mode": stream["mode"]
     }
 
 
+def _tee_to_disk(frames, out_path, num_frames, size):
+    """Pass frames through while writing them into a [N, H, W, 3] .npy"""
+    h, w = size
+    stack = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.uint8, shape=(num_frames, h, w, 3))
+    for idx, frame in enumerate(frames):
+        stack[idx] = frame
+        yield frame
+    stack.flush()
+    print(f"Lip-synced frames written: {out_path}")
+
+
+def _iter_wav2lip(avatar, audio_data, audio_sr, fps, num_frames):
+    """Full Wav2Lip lip sync, batched on LIPSYNC_DEVICE"""
+    
+    engine = Wav2LipEngine(registry.get("wav2lip"))
+    yield from engine.run(avatar, audio_data, audio_sr, fps, num_frames)
+
+
+# Mean absolute amplitude (0-1) above which the fallback marks a frame as speech
+SPEAKING_THRESHOLD = 0.02
+
+
+def audio_to_float(audio_data):
+    """PCM from wavfile.read (uint8/int16/int32/float, mono or [n, channels]) -> float32 in [-1, 1]"""
+    audio = np.asarray(audio_data)
+    if audio.dtype == np.uint8:
+        return (audio.astype(np.float32) - 128.0) / 128.0
+    if np.issubdtype(audio.dtype, np.integer):
+        return audio.astype(np.float32) / float(-np.iinfo(audio.dtype).min)
+    return audio.astype(np.float32, copy=False)
+
+
+def frame_energy(audio_data, audio_sr, fps, num_frames):
+    """
+    Mean absolute amplitude per video frame, in one vectorized pass.
+
+    Channels are averaged after taking the absolute value so out-of-phase
+    stereo does not cancel out. The PCM is zero-padded to num_frames whole
+    frames and reshaped to [num_frames, samples_per_frame]; the last partial
+    frame is averaged over its real samples only.
+    """
+    samples_per_frame = audio_sr // fps
+    amplitude = np.abs(audio_to_float(audio_data))
+    if amplitude.ndim > 1:
+        amplitude = amplitude.mean(axis=1)
+
+    total = num_frames * samples_per_frame
+    padded = np.zeros(total, dtype=np.float32)
+    used = min(total, len(amplitude))
+    padded[:used] = amplitude[:used]
+
+    sums = padded.reshape(num_frames, samples_per_frame).sum(axis=1)
+    counts = np.clip(len(amplitude) - np.arange(num_frames) * samples_per_frame, 0, samples_per_frame)
+    return np.divide(sums, counts, out=np.zeros(num_frames, dtype=np.float32), where=counts > 0)
+
+
+def _disk_mask(h, w, cx, cy, radius):
+    """Boolean mask of a filled circle clipped to the frame, plus its bounding box"""
+    y0, y1 = max(cy - radius, 0), min(cy + radius + 1, h)
+    x0, x1 = max(cx - radius, 0), min(cx + radius + 1, w)
+    ys, xs = np.ogrid[y0:y1, x0:x1]
+    return (ys - cy) ** 2 + (xs - cx) ** 2 <= radius ** 2, (y0, y1, x0, x1)
+
+
+def _render_fallback(avatar, energy, start, out):
+    """
+    Fill `out` ([k, H, W, 3]) with fallback frames start..start+k.
+
+    Source photos are cycled with one strided copy each, and the green
+    "speaking" dot is painted into all speaking frames at once.
+    """
+    k = len(out)
+    n_src = len(avatar)
+    for src in range(n_src):
+        first = (src - start) % n_src
+        out[first::n_src] = avatar.frames[src]
+    
+    speaking = np.nonzero(energy[start:start + k] > SPEAKING_THRESHOLD)[0]
+    if len(speaking):
+        h, w = out.shape[1:3]
+        mask, (y0, y1, x0, x1) = _disk_mask(h, w, w - 30, h - 30, 10)
+        intensity = np.minimum(energy[start + speaking] * 255 * 3, 255).astype(np.uint8)
+        patch = out[speaking, y0:y1, x0:x1]
+        patch[:, mask] = 0
+        patch[:, mask, 1] = intensity[:, None]
+        out[speaking, y0:y1, x0:x1] = patch
+    return len(speaking)
+
+
+def _iter_fallback(avatar, audio_data, audio_sr, fps, num_frames, chunk=None):
+    """Fallback frames, rendered STREAM_CHUNK_FRAMES at a time into a fresh block"""
+    chunk = chunk or STREAM_CHUNK_FRAMES
+    energy = frame_energy(audio_data, audio_sr, fps, num_frames)
+    h, w = avatar.frame_size
+    
+    for start in range(0, num_frames, chunk):
+        # New block per chunk: yielded frames stay valid after the next step
+        block = np.empty((min(chunk, num_frames - start), h, w, 3), dtype=np.uint8)
+        _render_fallback(avatar, energy, start, block)
+        yield from block
+
+
+def load_frames(frames_path: str):
+    """Memory-map a [N, H, W, 3] frame stack; legacy pickled frame lists still load"""
+    try:
+        return np.load(frames_path, mmap_mode="r")
+    except ValueError:
+        return np.load(frames_path, allow_pickle=True)
+
+
 def frames_to_video(frames_path: str, output_path: str, fps: int = 25):
     """Convert numpy frames to video file"""
     
-    frames = np.load(frames_path, allow_pickle=True)
+    frames = load_frames(frames_path)
     
     if len(frames) == 0:
         return {"success": False, "error": "No frames to convert"}
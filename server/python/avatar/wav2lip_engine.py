@@ -0,0 +1,244 @@
+# ======================================
+# YOcreator — Wav2Lip Inference Engine
+# server/python/avatar/wav2lip_engine.py
+# ======================================
+# Batched Wav2Lip inference on CPU or CUDA:
+#   1. mel spectrogram of the whole track, computed once (numpy, Wav2Lip hparams)
+#   2. one 16-step mel window per video frame
+#   3. face ROI of every avatar photo cropped once and kept on the device
+#   4. model run over batches of frames through reused (pinned) input buffers
+#   5. predicted ROI blended back into the full frame with a feathered mask
+#
+# torch is imported lazily so this module loads on nodes without it.
+
+import os
+from math import gcd
+
+import cv2
+import numpy as np
+from scipy import signal
+
+try:
+    from .face_roi import crop_roi, paste_roi, feather_mask
+except ImportError:
+    from face_roi import crop_roi, paste_roi, feather_mask
+
+# Wav2Lip audio hparams (hparams.py in the reference implementation)
+SAMPLE_RATE = 16000
+N_FFT = 800
+HOP_SIZE = 200
+WIN_SIZE = 800
+NUM_MELS = 80
+FMIN = 55
+FMAX = 7600
+PREEMPHASIS = 0.97
+REF_LEVEL_DB = 20
+MIN_LEVEL_DB = -100
+MAX_ABS_VALUE = 4.0
+
+MEL_STEP_SIZE = 16   # mel frames per video frame window
+IMG_SIZE = 96        # model face resolution
+
+# "auto" picks CUDA when available
+DEVICE = os.getenv("LIPSYNC_DEVICE", "auto")
+BATCH_SIZE = max(1, int(os.getenv("LIPSYNC_BATCH_SIZE", "32")))
+# torch intra-op threads on CPU; 0 leaves torch's default
+CPU_THREADS = int(os.getenv("LIPSYNC_CPU_THREADS", "0"))
+
+
+# ------------------------------------------------------------------
+# Audio
+# ------------------------------------------------------------------
+
+_MEL_LOG_STEP = np.log(6.4) / 27.0
+
+
+def _hz_to_mel(freqs):
+    """Slaney mel scale (librosa default): linear below 1 kHz, log above"""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    log_part = 15.0 + np.log(np.maximum(freqs, 1000.0) / 1000.0) / _MEL_LOG_STEP
+    return np.where(freqs >= 1000.0, log_part, freqs / (200.0 / 3))
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    log_part = 1000.0 * np.exp(_MEL_LOG_STEP * (np.maximum(mels, 15.0) - 15.0))
+    return np.where(mels >= 15.0, log_part, mels * (200.0 / 3))
+
+
+def mel_basis(sr=SAMPLE_RATE, n_fft=N_FFT, n_mels=NUM_MELS, fmin=FMIN, fmax=FMAX):
+    """[n_mels, 1 + n_fft // 2] Slaney-normalized triangular filters"""
+    fft_freqs = np.linspace(0, sr / 2, 1 + n_fft // 2)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, None]
+    return weights.astype(np.float32)
+
+
+_MEL_BASIS = None
+
+
+def to_model_audio(audio_data, audio_sr):
+    """PCM from wavfile.read -> mono float32 at SAMPLE_RATE"""
+    audio = np.asarray(audio_data)
+    if audio.dtype == np.uint8:
+        audio = (audio.astype(np.float32) - 128.0) / 128.0
+    elif np.issubdtype(audio.dtype, np.integer):
+        audio = audio.astype(np.float32) / float(-np.iinfo(audio.dtype).min)
+    else:
+        audio = audio.astype(np.float32, copy=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+
+    if audio_sr != SAMPLE_RATE:
+        g = gcd(int(audio_sr), SAMPLE_RATE)
+        audio = signal.resample_poly(audio, SAMPLE_RATE // g, int(audio_sr) // g).astype(np.float32)
+    return audio
+
+
+def melspectrogram(wav):
+    """
+    Normalized log-mel spectrogram [NUM_MELS, T] of 16 kHz mono audio,
+    matching Wav2Lip's audio.melspectrogram.
+    """
+    global _MEL_BASIS
+    if _MEL_BASIS is None:
+        _MEL_BASIS = mel_basis()
+
+    wav = signal.lfilter([1, -PREEMPHASIS], [1], wav).astype(np.float32)
+
+    # Centered STFT with reflect padding, periodic Hann window
+    pad = N_FFT // 2
+    wav = np.pad(wav, pad, mode="reflect" if len(wav) > pad else "constant")
+    frames = np.lib.stride_tricks.sliding_window_view(wav, N_FFT)[::HOP_SIZE]
+    window = signal.get_window("hann", WIN_SIZE, fftbins=True).astype(np.float32)
+    magnitude = np.abs(np.fft.rfft(frames * window, axis=1)).T
+
+    mel_db = 20 * np.log10(np.maximum(1e-5, _MEL_BASIS @ magnitude)) - REF_LEVEL_DB
+    scaled = (2 * MAX_ABS_VALUE) * ((mel_db - MIN_LEVEL_DB) / -MIN_LEVEL_DB) - MAX_ABS_VALUE
+    return np.clip(scaled, -MAX_ABS_VALUE, MAX_ABS_VALUE).astype(np.float32)
+
+
+def mel_windows(mel, fps, num_frames):
+    """
+    [num_frames, NUM_MELS, MEL_STEP_SIZE] mel window per video frame.
+
+    Frame i starts at mel index int(i * 80 / fps) (80 mel frames per second
+    at hop 200 / 16 kHz); windows running past the end use the last
+    MEL_STEP_SIZE frames, as in Wav2Lip's inference script.
+    """
+    if mel.shape[1] < MEL_STEP_SIZE:
+        mel = np.pad(mel, ((0, 0), (0, MEL_STEP_SIZE - mel.shape[1])), mode="edge")
+
+    starts = (np.arange(num_frames) * (SAMPLE_RATE / HOP_SIZE / fps)).astype(np.int64)
+    starts = np.minimum(starts, mel.shape[1] - MEL_STEP_SIZE)
+    windows = np.lib.stride_tricks.sliding_window_view(mel, MEL_STEP_SIZE, axis=1)
+    return windows[:, starts].transpose(1, 0, 2)
+
+
+# ------------------------------------------------------------------
+# Device
+# ------------------------------------------------------------------
+
+def resolve_device(name=None):
+    """torch.device for `name` (default LIPSYNC_DEVICE); applies CPU thread settings"""
+    import torch
+
+    name = (name or DEVICE).lower()
+    if name == "auto":
+        name = "cuda" if torch.cuda.is_available() else "cpu"
+    device = torch.device(name)
+
+    if device.type == "cpu" and CPU_THREADS > 0 and torch.get_num_threads() != CPU_THREADS:
+        torch.set_num_threads(CPU_THREADS)
+    return device
+
+
+# ------------------------------------------------------------------
+# Faces
+# ------------------------------------------------------------------
+
+def face_inputs(avatar, img_size=IMG_SIZE):
+    """
+    [N, 6, img_size, img_size] float32 model input per avatar photo: the
+    face ROI with its lower half masked, stacked with the full ROI.
+    """
+    n = len(avatar)
+    inputs = np.empty((n, 6, img_size, img_size), dtype=np.float32)
+    for i in range(n):
+        crop = crop_roi(avatar.frames[i], avatar.roi_affines[i], avatar.roi_size)
+        if avatar.roi_size != img_size:
+            crop = cv2.resize(crop, (img_size, img_size), interpolation=cv2.INTER_AREA)
+        crop = crop.transpose(2, 0, 1).astype(np.float32) / 255.0
+        inputs[i, 3:] = crop
+        inputs[i, :3] = crop
+        inputs[i, :3, img_size // 2:] = 0
+    return inputs
+
+
+# ------------------------------------------------------------------
+# Engine
+# ------------------------------------------------------------------
+
+class Wav2LipEngine:
+    """
+    Runs a loaded Wav2Lip model over whole videos in fixed-size batches.
+
+    Mel input goes through one host buffer (pinned on CUDA) and one device
+    buffer allocated up front and reused for every batch; face inputs are
+    staged on the device once per avatar and gathered by index.
+    """
+
+    def __init__(self, model, device=None, batch_size=None, img_size=IMG_SIZE):
+        import torch
+
+        self.torch = torch
+        self.model = model
+        self.device = device or next(model.parameters()).device
+        self.batch_size = batch_size or BATCH_SIZE
+        self.img_size = img_size
+
+        pin = self.device.type == "cuda"
+        shape = (self.batch_size, 1, NUM_MELS, MEL_STEP_SIZE)
+        self._mel_host = torch.empty(shape, dtype=torch.float32, pin_memory=pin)
+        self._mel_device = self._mel_host if self.device.type == "cpu" else torch.empty(shape, device=self.device)
+
+    def run(self, avatar, audio_data, audio_sr, fps, num_frames):
+        """Yield num_frames lip-synced HxWx3 uint8 BGR frames"""
+        torch = self.torch
+
+        windows = mel_windows(melspectrogram(to_model_audio(audio_data, audio_sr)), fps, num_frames)
+        faces = torch.from_numpy(face_inputs(avatar, self.img_size)).to(self.device)
+        mask = feather_mask(avatar.roi_size)
+        sources = np.arange(num_frames) % len(avatar)
+        mel_view = self._mel_host.numpy()
+
+        with torch.inference_mode():
+            for start in range(0, num_frames, self.batch_size):
+                k = min(self.batch_size, num_frames - start)
+                src = sources[start:start + k]
+
+                mel_view[:k, 0] = windows[start:start + k]
+                if self._mel_device is not self._mel_host:
+                    self._mel_device[:k].copy_(self._mel_host[:k], non_blocking=True)
+                face_batch = faces[torch.from_numpy(src).to(self.device)]
+
+                pred = self.model(self._mel_device[:k], face_batch)
+                pred = (pred.clamp(0, 1) * 255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+
+                for j in range(k):
+                    yield self._paste(avatar, src[j], pred[j], mask)
+
+                if start % (self.batch_size * 10) == 0:
+                    print(f"Processed frame {start + k}/{num_frames}")
+
+    @staticmethod
+    def _paste(avatar, idx, face, mask):
+        if face.shape[0] != avatar.roi_size:
+            face = cv2.resize(face, (avatar.roi_size, avatar.roi_size), interpolation=cv2.INTER_LINEAR)
+        return paste_roi(avatar.frames[idx], face, avatar.roi_affines[idx], mask)
@@ -2,8 +2,10 @@
 YoCreator Avatar Generator Engine
 =================================
 
-This is the backend scaffold for generating parametric avatars.
-Currently returns stub paths - extend with MakeHuman/Blender pipeline later.
+Backend for generating parametric avatars. Meshes are blended from the
+morph-target stack in mesh.py and written as GLB by glb.py into a
+size-bounded model cache. Services call prewarm() at startup so the first
+request does not pay for loading the base mesh and its normal basis.
 
 Future capabilities:
 - MakeHuman integration for parametric mesh generation
@@ -14,12 +16,52 @@ Future capabilities:
 - Hair system generation
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, Any, Optional
+import re
+import sys
+import time
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+try:
+    from .mesh import build_mesh, build_meshes, prewarm_base_mesh
+    from .glb import write_glb, hex_to_linear_rgba
+except ImportError:
+    from mesh import build_mesh, build_meshes, prewarm_base_mesh
+    from glb import write_glb, hex_to_linear_rgba
+
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.disk_cache import DiskCache
+
+# Where export_avatar() writes files, and the URL prefix they are served under
+EXPORT_DIR = os.path.abspath(os.getenv(
+    "AVATAR_EXPORT_DIR", os.path.join(os.path.dirname(__file__), "../../../pipeline/output/exports")
+))
+EXPORT_URL = os.getenv("AVATAR_EXPORT_URL", "/exports").rstrip("/")
+
+# Avatar ids name files in EXPORT_DIR, so no separators or dots
+AVATAR_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Where generate_avatar() writes model GLBs, and the URL prefix they are served under
+MODEL_DIR = os.path.abspath(os.getenv(
+    "AVATAR_MODEL_DIR", os.path.join(os.path.dirname(__file__), "../../../pipeline/output/models")
+))
+MODEL_URL = os.getenv("AVATAR_MODEL_URL", "/models/generated").rstrip("/")
+
+# Generated GLBs, one per parameter set, least recently used evicted first
+# (slider editing produces a new ~1 MB model per distinct value)
+MODEL_CACHE = DiskCache(
+    MODEL_DIR,
+    max_bytes=int(float(os.getenv("AVATAR_MODEL_CACHE_MB", "512")) * 1024 * 1024),
+    name="avatar-models",
+)
+
 
 class Gender(Enum):
     MALE = "male"
@@ -96,7 +138,12 @@ class GeneratedAvatar:
     thumbnail_path: Optional[str]
     params: Dict[str, Any]
     format: str = "glb"
-    
+    model_id: Optional[str] = None
+    file_size: int = 0
+    vertex_count: int = 0
+    face_count: int = 0
+    generation_ms: float = 0.0
+
 
 def parse_frontend_params(params: Dict[str, Any]) -> AvatarMorphParams:
     """
@@ -132,44 +179,108 @@ def generate_avatar(params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate an avatar based on morph parameters.
     
-    Currently returns a stub GLB path.
-    Extend later with MakeHuman/Blender pipeline.
+    Blends the morph targets into a mesh (see mesh.py) and writes it as a
+    GLB into MODEL_CACHE, named by a hash of the parameters so repeated
+    requests reuse the file. Hair and clothing are not attached yet.
     
     Args:
         params: Dictionary of morph parameters from frontend
         
     Returns:
         Dictionary containing:
-        - model_path: Path to generated GLB file
+        - model_path: URL of the generated GLB (MODEL_URL/<model_id>.glb)
+        - model_id: Parameter hash naming the GLB
+        - file_size: GLB size in bytes
         - thumbnail_path: Path to generated thumbnail (if any)
         - params: The processed parameters
         - format: Output format (glb, vrm, etc.)
+        - vertex_count, face_count: Size of the generated mesh
+        - generation_ms: Time spent blending and writing the mesh
     """
     # Parse frontend parameters
     morph_params = parse_frontend_params(params)
     
-    # TODO: Implement actual mesh generation
-    # Future implementation will:
-    # 1. Load base mesh from MakeHuman
-    # 2. Apply morph targets based on params
-    # 3. Attach hair mesh based on style
-    # 4. Attach clothing meshes
-    # 5. Apply material colors
-    # 6. Export to GLB/VRM format
+    started = time.perf_counter()
+    mesh = build_mesh(morph_params)
+    result = _avatar_result(morph_params, mesh)
+    result["generation_ms"] = round((time.perf_counter() - started) * 1000, 3)
     
-    # For now, return stub path
-    base_model = "base_humanoid_male.glb" if morph_params.gender == "male" else "base_humanoid_female.glb"
+    return result
+
+
+def _model_id(morph_params: AvatarMorphParams) -> str:
+    """Stable id for a parameter set"""
+    key = json.dumps(asdict(morph_params), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _avatar_result(morph_params: AvatarMorphParams, mesh) -> Dict[str, Any]:
+    """Write the blended mesh to MODEL_CACHE (once per parameter set) and describe it"""
+    model_id = _model_id(morph_params)
+    path = MODEL_CACHE.get(model_id, ".glb")
+    if path is None:
+        base_color = hex_to_linear_rgba(morph_params.skin_color)
+        path = MODEL_CACHE.put(model_id, lambda tmp: write_glb(tmp, mesh, base_color=base_color), ".glb")
+    file_size = os.path.getsize(path)
     
     result = GeneratedAvatar(
-        model_path=f"/models/{base_model}",
+        model_path=f"{MODEL_URL}/{model_id}.glb",
         thumbnail_path=None,
         params=asdict(morph_params),
-        format="glb"
+        format="glb",
+        model_id=model_id,
+        file_size=file_size,
+        vertex_count=mesh.vertex_count,
+        face_count=mesh.face_count,
     )
     
     return asdict(result)
 
 
+def generate_avatars(params_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Generate many avatar variants (presets, thumbnails) in one batch.
+    
+    All params are parsed up front and blended together as one
+    [batch, morphs] @ [morphs, verts*3] product against the shared base;
+    each variant is then written as a GLB like generate_avatar().
+    
+    Args:
+        params_list: List of frontend morph parameter dictionaries
+        
+    Returns:
+        Dictionary containing:
+        - avatars: generate_avatar() result per variant, in order;
+          generation_ms is the variant's share of the batch time
+        - count: Number of variants
+        - total_ms: Wall time for the whole batch, GLB writes included
+        - per_item_ms: total_ms / count
+        - avatars_per_second, vertices_per_second: Batch throughput
+    """
+    morph_params = [parse_frontend_params(p) for p in params_list]
+    
+    started = time.perf_counter()
+    meshes = build_meshes(morph_params)
+    avatars = [_avatar_result(p, mesh) for p, mesh in zip(morph_params, meshes)]
+    total_ms = (time.perf_counter() - started) * 1000
+    
+    count = len(meshes)
+    per_item_ms = total_ms / count if count else 0.0
+    vertices = sum(mesh.vertex_count for mesh in meshes)
+    seconds = total_ms / 1000
+    for avatar in avatars:
+        avatar["generation_ms"] = round(per_item_ms, 3)
+    
+    return {
+        "avatars": avatars,
+        "count": count,
+        "total_ms": round(total_ms, 3),
+        "per_item_ms": round(per_item_ms, 3),
+        "avatars_per_second": round(count / seconds, 1) if seconds > 0 else None,
+        "vertices_per_second": round(vertices / seconds) if seconds > 0 else None,
+    }
+
+
 def generate_avatar_with_face(params: Dict[str, Any], face_image_path: str) -> Dict[str, Any]:
     """
     Generate avatar with face texture from scanned image.
@@ -204,33 +315,64 @@ def generate_avatar_with_face(params: Dict[str, Any], face_image_path: str) -> D
     return asdict(result)
 
 
-def export_avatar(avatar_id: str, format: str = "glb") -> Dict[str, Any]:
+def export_avatar(avatar_id: str, format: str = "glb", params: Optional[Dict[str, Any]] = None,
+                  quantize: bool = False, texture_path: Optional[str] = None) -> Dict[str, Any]:
     """
-    Export saved avatar to specified format.
+    Export an avatar to a file in EXPORT_DIR.
+    
+    The file holds the blended body mesh and skin material only; hair and
+    clothing meshes are not attached yet.
     
     Args:
-        avatar_id: ID of saved avatar
-        format: Export format (glb, vrm, fbx)
+        avatar_id: ID of saved avatar (names the output file; letters,
+                   digits, "_" and "-" only)
+        format: Export format; only glb is implemented (vrm, fbx fail)
+        params: The avatar's frontend morph parameters (defaults if omitted)
+        quantize: Store attributes with KHR_mesh_quantization (smaller file)
+        texture_path: Optional PNG/JPEG embedded as the skin texture
         
     Returns:
-        Export result with download path
+        Export result with download_path (EXPORT_URL/<avatar_id>.glb),
+        file_path on disk and the real file size
     """
-    # TODO: Implement export pipeline
-    # Future implementation will:
-    # 1. Load saved avatar configuration
-    # 2. Regenerate mesh if needed
-    # 3. Apply format-specific optimizations
-    # 4. Export to requested format
+    if not AVATAR_ID_PATTERN.match(avatar_id or ""):
+        return {"success": False, "avatar_id": avatar_id, "format": format,
+                "error": f"Invalid avatar id: {avatar_id!r}"}
+    if format != "glb":
+        return {"success": False, "avatar_id": avatar_id, "format": format,
+                "error": f"Unsupported export format: {format}"}
+    
+    morph_params = parse_frontend_params(params or {})
+    out_path = os.path.join(EXPORT_DIR, f"{avatar_id}.{format}")
+    
+    started = time.perf_counter()
+    mesh = build_mesh(morph_params)
+    file_size = write_glb(out_path, mesh, quantize=quantize,
+                          base_color=hex_to_linear_rgba(morph_params.skin_color),
+                          texture_path=texture_path)
+    export_ms = (time.perf_counter() - started) * 1000
     
     return {
         "success": True,
         "avatar_id": avatar_id,
         "format": format,
-        "download_path": f"/exports/{avatar_id}.{format}",
-        "file_size": 0  # Will be actual size after implementation
+        "download_path": f"{EXPORT_URL}/{avatar_id}.{format}",
+        "file_path": out_path,
+        "file_size": file_size,
+        "quantized": quantize,
+        "vertex_count": mesh.vertex_count,
+        "export_ms": round(export_ms, 3),
     }
 
 
+def prewarm():
+    """
+    Load the base mesh and normal basis on a daemon thread; returns the
+    thread. Call once at service startup.
+    """
+    return prewarm_base_mesh()
+
+
 def get_available_assets() -> Dict[str, Any]:
     """
     Get list of available avatar assets (hair, clothing, etc.)
@@ -273,6 +415,15 @@ if __name__ == "__main__":
         
         result = generate_avatar(test_params)
         print(json.dumps(result, indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # One variant per skin preset, blended as a single batch
+        presets = get_available_assets()["skin_presets"]
+        result = generate_avatars([{"gender": "female", "skinColor": p["color"]} for p in presets])
+        result["avatars"] = [
+            {"skin_color": a["params"]["skin_color"], "vertex_count": a["vertex_count"]}
+            for a in result["avatars"]
+        ]
+        print(json.dumps(result, indent=2))
     elif len(sys.argv) > 1 and sys.argv[1] == "assets":
         # List available assets
         assets = get_available_assets()
@@ -281,4 +432,5 @@ if __name__ == "__main__":
         print("YoCreator Avatar Generator")
         print("Usage:")
         print("  python generator.py test    - Test avatar generation")
+        print("  python generator.py batch   - Batch-generate one variant per skin preset")
         print("  python generator.py assets  - List available assets")
@@ -0,0 +1,264 @@
+"""
+YoCreator GLB Writer
+====================
+
+Binary glTF 2.0 (.glb) export for AvatarMesh.
+
+Vertex, normal, UV and index arrays go into the BIN chunk through
+memoryviews of the NumPy buffers, each padded to a 4-byte boundary. The
+layout is computed first, so the header can carry the total length and the
+file is streamed out piece by piece; the whole file is never assembled in
+memory. Targets can be a path (written to a temp file, then renamed), a
+binary file object, or a socket.
+
+With quantize=True the attributes are stored per KHR_mesh_quantization:
+POSITION as int16 (dequantized by the node's uniform scale/translation, so
+normals stay valid under the node transform), NORMAL as normalized int8 and
+TEXCOORD_0 as normalized uint16, roughly halving the download.
+"""
+
+import os
+import json
+import struct
+import tempfile
+
+import numpy as np
+
+GLB_MAGIC = 0x46546C67      # "glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# glTF componentType / bufferView target constants
+BYTE = 5120
+UNSIGNED_SHORT = 5123
+SHORT = 5122
+UNSIGNED_INT = 5125
+FLOAT = 5126
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+COMPONENT_TYPES = {
+    np.dtype(np.int8): BYTE,
+    np.dtype(np.int16): SHORT,
+    np.dtype(np.uint16): UNSIGNED_SHORT,
+    np.dtype(np.uint32): UNSIGNED_INT,
+    np.dtype(np.float32): FLOAT,
+}
+
+# Image bytes are copied from disk in pieces of this size
+STREAM_CHUNK = 1024 * 1024
+
+IMAGE_MIME_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+
+def _pad(n):
+    return (4 - n % 4) % 4
+
+
+def _bytes_view(array):
+    """Flat byte memoryview of a C-contiguous array (no copy when it already is)"""
+    return memoryview(np.ascontiguousarray(array)).cast("B")
+
+
+def _quantize(mesh):
+    """KHR_mesh_quantization attributes plus the node transform that undoes them"""
+    lo = mesh.vertices.min(axis=0)
+    hi = mesh.vertices.max(axis=0)
+    center = (lo + hi) / 2
+    # One scale for all axes: viewers transform normals by the inverse
+    # transpose of the node matrix, which a non-uniform scale would skew
+    scale = np.full(3, max(float((hi - lo).max()) / 2, 1e-9) / 32767)
+
+    # Vertex attribute strides must be multiples of 4: pad VEC3 to 4 lanes
+    positions = np.zeros((mesh.vertex_count, 4), dtype=np.int16)
+    np.rint((mesh.vertices - center) / scale, out=positions[:, :3], casting="unsafe")
+    normals = np.zeros((mesh.vertex_count, 4), dtype=np.int8)
+    np.rint(mesh.normals * 127, out=normals[:, :3], casting="unsafe")
+    uvs = np.rint(np.clip(mesh.uvs, 0.0, 1.0) * 65535).astype(np.uint16)
+
+    node = {"translation": center.tolist(), "scale": scale.tolist()}
+    return positions, normals, uvs, node
+
+
+class _Layout:
+    """Buffer views and accessors, with their byte ranges in the BIN chunk"""
+
+    def __init__(self):
+        self.parts = []            # (memoryview or (path, size), padding)
+        self.buffer_views = []
+        self.accessors = []
+        self.length = 0
+
+    def add_view(self, source, size, target=None, stride=None):
+        view = {"buffer": 0, "byteOffset": self.length, "byteLength": size}
+        if target:
+            view["target"] = target
+        if stride:
+            view["byteStride"] = stride
+        padding = _pad(size)
+        self.parts.append((source, padding))
+        self.length += size + padding
+        self.buffer_views.append(view)
+        return len(self.buffer_views) - 1
+
+    def add_accessor(self, array, kind, target, components=None, normalized=False, bounds=False):
+        """array rows are elements; components < row width means padded lanes"""
+        data = _bytes_view(array)
+        stride = array.strides[0] if components and components != array.shape[1] else None
+        view = self.add_view(data, data.nbytes, target, stride)
+        accessor = {
+            "bufferView": view,
+            "componentType": COMPONENT_TYPES[array.dtype],
+            "count": len(array),
+            "type": kind,
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if bounds:
+            cols = array[:, :components] if components else array
+            cast = float if array.dtype.kind == "f" else int
+            accessor["min"] = [cast(v) for v in cols.min(axis=0)]
+            accessor["max"] = [cast(v) for v in cols.max(axis=0)]
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+def build_gltf(mesh, quantize=False, base_color=None, texture_path=None):
+    """glTF JSON dict and the BIN chunk layout for an AvatarMesh"""
+    layout = _Layout()
+    node = {"mesh": 0}
+
+    if quantize:
+        positions, normals, uvs, transform = _quantize(mesh)
+        node.update(transform)
+        attributes = {
+            "POSITION": layout.add_accessor(positions, "VEC3", ARRAY_BUFFER, components=3, bounds=True),
+            "NORMAL": layout.add_accessor(normals, "VEC3", ARRAY_BUFFER, components=3, normalized=True),
+            "TEXCOORD_0": layout.add_accessor(uvs, "VEC2", ARRAY_BUFFER, normalized=True),
+        }
+        index_dtype = np.uint16 if mesh.vertex_count <= 0xFFFF else np.uint32
+        indices = mesh.faces.reshape(-1).astype(index_dtype, copy=False)
+    else:
+        attributes = {
+            "POSITION": layout.add_accessor(mesh.vertices.astype(np.float32, copy=False), "VEC3",
+                                            ARRAY_BUFFER, bounds=True),
+            "NORMAL": layout.add_accessor(mesh.normals.astype(np.float32, copy=False), "VEC3", ARRAY_BUFFER),
+            "TEXCOORD_0": layout.add_accessor(mesh.uvs.astype(np.float32, copy=False), "VEC2", ARRAY_BUFFER),
+        }
+        indices = mesh.faces.reshape(-1).astype(np.uint32, copy=False)
+
+    primitive = {
+        "attributes": attributes,
+        "indices": layout.add_accessor(indices.reshape(-1, 1), "SCALAR", ELEMENT_ARRAY_BUFFER),
+        "material": 0,
+        "mode": 4,
+    }
+
+    material = {"pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 0.6}}
+    if base_color is not None:
+        material["pbrMetallicRoughness"]["baseColorFactor"] = [float(c) for c in base_color]
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": "YoCreator avatar_engine"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [node],
+        "meshes": [{"primitives": [primitive]}],
+        "materials": [material],
+    }
+
+    if texture_path:
+        ext = os.path.splitext(texture_path)[1].lower()
+        if ext not in IMAGE_MIME_TYPES:
+            raise ValueError(f"Unsupported texture format: {ext}")
+        size = os.path.getsize(texture_path)
+        view = layout.add_view((texture_path, size), size)
+        gltf["images"] = [{"bufferView": view, "mimeType": IMAGE_MIME_TYPES[ext]}]
+        gltf["samplers"] = [{"magFilter": 9729, "minFilter": 9987}]
+        gltf["textures"] = [{"sampler": 0, "source": 0}]
+        material["pbrMetallicRoughness"]["baseColorTexture"] = {"index": 0}
+
+    if quantize:
+        gltf["extensionsUsed"] = ["KHR_mesh_quantization"]
+        gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
+
+    gltf["bufferViews"] = layout.buffer_views
+    gltf["accessors"] = layout.accessors
+    gltf["buffers"] = [{"byteLength": layout.length}]
+    return gltf, layout
+
+
+def _stream(write, layout):
+    zeros = bytes(4)
+    for source, padding in layout.parts:
+        if isinstance(source, tuple):
+            path, _ = source
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(STREAM_CHUNK)
+                    if not chunk:
+                        break
+                    write(chunk)
+        else:
+            write(source)
+        if padding:
+            write(zeros[:padding])
+
+
+def _write_to(write, gltf, layout):
+    """Header, JSON chunk and BIN chunk; returns the total bytes written"""
+    json_bytes = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_bytes += b" " * _pad(len(json_bytes))
+    total = 12 + 8 + len(json_bytes) + 8 + layout.length
+
+    write(struct.pack("<III", GLB_MAGIC, GLB_VERSION, total))
+    write(struct.pack("<II", len(json_bytes), CHUNK_JSON))
+    write(json_bytes)
+    write(struct.pack("<II", layout.length, CHUNK_BIN))
+    _stream(write, layout)
+    return total
+
+
+def write_glb(target, mesh, quantize=False, base_color=None, texture_path=None):
+    """
+    Write an AvatarMesh as GLB.
+
+    Args:
+        target: Output path, binary file object (write) or socket (sendall)
+        mesh: AvatarMesh from mesh.build_mesh()
+        quantize: Store attributes with KHR_mesh_quantization
+        base_color: Optional linear RGBA baseColorFactor
+        texture_path: Optional PNG/JPEG embedded as the base color texture
+
+    Returns:
+        File size in bytes
+    """
+    gltf, layout = build_gltf(mesh, quantize, base_color, texture_path)
+
+    if hasattr(target, "sendall"):
+        return _write_to(target.sendall, gltf, layout)
+    if hasattr(target, "write"):
+        return _write_to(target.write, gltf, layout)
+
+    path = os.path.abspath(os.fspath(target))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique temp file, so concurrent writers of the same path never share one
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".glb")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            size = _write_to(f.write, gltf, layout)
+        os.chmod(tmp, 0o644)    # mkstemp creates 0600; exports are served
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return size
+
+
+def hex_to_linear_rgba(color):
+    """'#rrggbb' sRGB -> linear RGBA list for baseColorFactor"""
+    value = color.lstrip("#")
+    srgb = np.array([int(value[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    return [round(float(c), 4) for c in linear] + [1.0]
@@ -0,0 +1,428 @@
+"""
+YoCreator Avatar Mesh Engine
+============================
+
+Morph-target mesh generation behind generate_avatar().
+
+The base mesh and its morph targets are loaded once per process into
+contiguous float32 arrays:
+
+    vertices  [V, 3]      neutral (male) base
+    deltas    [M, V*3]    one row per morph, the offset at weight 1.0
+
+so a variant is a single matrix product, base + weights @ deltas, and its
+normals a second one against a precomputed normal basis (see
+_normal_basis); no Python loop touches vertices. Batches blend all variants
+in the same two products.
+
+The base comes from AVATAR_BASE_MESH (.npz with vertices, faces, uvs,
+deltas, morph_names) when set, otherwise from a procedural lathe humanoid
+built here with region-masked deltas for every slider.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Optional .npz with a production base mesh; procedural base when unset
+AVATAR_BASE_MESH = os.getenv("AVATAR_BASE_MESH", "")
+
+# Procedural base resolution: rings along the body axis x segments around it
+MESH_RINGS = int(os.getenv("AVATAR_MESH_RINGS", "192"))
+MESH_SEGMENTS = int(os.getenv("AVATAR_MESH_SEGMENTS", "96"))
+
+# Morph order in the delta stack. Sliders are multipliers around 1.0, so a
+# morph's weight is value - 1.0; gender blends the male base (0) to female (1).
+# The frontend gender slider runs 0 = female .. 100 = male (see gender_weight).
+MORPH_NAMES = (
+    "gender",
+    "height",
+    "face_width",
+    "depth",
+    "jaw_width",
+    "cheekbones",
+    "nose_size",
+    "lip_fullness",
+    "eye_size",
+    "eye_spacing",
+)
+
+# Variants blended per matrix product in build_meshes()
+BATCH_CHUNK = max(1, int(os.getenv("AVATAR_BATCH_CHUNK", "64")))
+
+# Largest precomputed normal basis (morph pairs x verts*3 float32) in MB;
+# bigger bases recompute normals from the blended vertices instead
+NORMAL_BASIS_MAX_MB = int(os.getenv("AVATAR_NORMAL_BASIS_MAX_MB", "256"))
+
+# Slider values are clamped to this range before blending
+MORPH_RANGE = (0.5, 1.5)
+
+# Body profile (height m, half-width m, half-depth m) from feet to crown
+MALE_PROFILE = np.array([
+    (0.000, 0.000, 0.000),
+    (0.020, 0.150, 0.110),
+    (0.450, 0.160, 0.105),
+    (0.850, 0.185, 0.120),
+    (1.000, 0.160, 0.105),
+    (1.300, 0.210, 0.120),
+    (1.440, 0.230, 0.110),
+    (1.500, 0.070, 0.060),
+    (1.560, 0.065, 0.060),
+    (1.600, 0.080, 0.092),
+    (1.680, 0.092, 0.104),
+    (1.760, 0.088, 0.100),
+    (1.800, 0.050, 0.060),
+    (1.820, 0.000, 0.000),
+], dtype=np.float64)
+
+FEMALE_PROFILE = np.array([
+    (0.000, 0.000, 0.000),
+    (0.020, 0.140, 0.100),
+    (0.450, 0.150, 0.100),
+    (0.850, 0.200, 0.120),
+    (1.000, 0.140, 0.095),
+    (1.300, 0.185, 0.125),
+    (1.440, 0.195, 0.100),
+    (1.500, 0.060, 0.055),
+    (1.560, 0.058, 0.055),
+    (1.600, 0.072, 0.088),
+    (1.680, 0.086, 0.100),
+    (1.760, 0.084, 0.098),
+    (1.800, 0.048, 0.058),
+    (1.820, 0.000, 0.000),
+], dtype=np.float64)
+
+# Face landmarks on the procedural base (y in m, on the front of the head)
+JAW_Y = 1.600
+MOUTH_Y = 1.615
+NOSE_Y = 1.650
+CHEEK_Y = 1.665
+EYE_Y = 1.685
+EYE_X = 0.035
+HEAD_Y = (1.560, 1.820)
+
+
+@dataclass(frozen=True)
+class BaseMesh:
+    """Shared, read-only base geometry and morph stack"""
+    vertices: np.ndarray      # [V, 3] float32
+    faces: np.ndarray         # [F, 3] uint32
+    uvs: np.ndarray           # [V, 2] float32
+    deltas: np.ndarray        # [M, V*3] float32, C-contiguous
+    morph_names: Tuple[str, ...]
+    seam: Tuple[np.ndarray, np.ndarray]   # UV-seam duplicate vertex pairs
+    normal_basis: Optional[np.ndarray] = None   # [P, V*3], see _normal_basis()
+
+    @property
+    def vertex_count(self):
+        return len(self.vertices)
+
+
+@dataclass
+class AvatarMesh:
+    """One generated variant"""
+    vertices: np.ndarray      # [V, 3] float32
+    normals: np.ndarray       # [V, 3] float32
+    faces: np.ndarray         # [F, 3] uint32 (shared with the base)
+    uvs: np.ndarray           # [V, 2] float32 (shared with the base)
+
+    @property
+    def vertex_count(self):
+        return len(self.vertices)
+
+    @property
+    def face_count(self):
+        return len(self.faces)
+
+
+def _lathe(profile, rings, segments):
+    """Revolve an elliptical (y, rx, rz) profile around the y axis"""
+    t = np.linspace(0.0, 1.0, rings + 1)
+    y = np.interp(t, np.linspace(0.0, 1.0, len(profile)), profile[:, 0])
+    rx = np.interp(y, profile[:, 0], profile[:, 1])
+    rz = np.interp(y, profile[:, 0], profile[:, 2])
+
+    # segments + 1 columns: the last duplicates the first so UVs can wrap
+    theta = np.linspace(0.0, 2.0 * np.pi, segments + 1)
+    vertices = np.stack([
+        rx[:, None] * np.cos(theta)[None, :],
+        np.broadcast_to(y[:, None], (rings + 1, segments + 1)),
+        rz[:, None] * np.sin(theta)[None, :],
+    ], axis=-1).reshape(-1, 3)
+    return vertices
+
+
+def _grid_topology(rings, segments):
+    """Two triangles per quad of the (rings+1) x (segments+1) vertex grid"""
+    cols = segments + 1
+    r, s = np.meshgrid(np.arange(rings), np.arange(segments), indexing="ij")
+    a = (r * cols + s).ravel()
+    b = a + 1
+    c = a + cols
+    d = c + 1
+    # Counter-clockwise seen from outside (+z front at theta = 90 degrees)
+    faces = np.concatenate([np.stack([a, c, b], 1), np.stack([b, c, d], 1)])
+
+    u, v = np.meshgrid(np.linspace(0.0, 1.0, cols), np.linspace(1.0, 0.0, rings + 1))
+    uvs = np.stack([u.ravel(), v.ravel()], 1)
+
+    seam_first = np.arange(rings + 1) * cols
+    seam_last = seam_first + segments
+    return faces.astype(np.uint32), uvs.astype(np.float32), (seam_first, seam_last)
+
+
+def _bump(vertices, center, sigma, front_only=True):
+    """Gaussian falloff around a point; optionally zero on the back of the body"""
+    d = (vertices - np.asarray(center)) / np.asarray(sigma)
+    w = np.exp(-0.5 * np.sum(d * d, axis=1))
+    if front_only:
+        w *= vertices[:, 2] > 0
+    return w[:, None]
+
+
+def _procedural_deltas(vertices, female):
+    """Offsets at weight 1.0 for MORPH_NAMES, each [V, 3]"""
+    x, y, z = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+    zero = np.zeros_like(x)
+    head = np.clip((y - HEAD_Y[0]) / 0.03, 0.0, 1.0)[:, None]
+
+    eye_centers = np.stack([np.sign(x) * EYE_X, np.full_like(x, EYE_Y), z], 1)
+    eyes = _bump(vertices, (0.0, EYE_Y, 0.0), (EYE_X + 0.03, 0.015, 1.0)) * \
+        np.exp(-0.5 * ((np.abs(x) - EYE_X) / 0.015) ** 2)[:, None]
+
+    deltas = {
+        "gender": female - vertices,
+        "height": np.stack([zero, y, zero], 1),
+        "face_width": head * np.stack([x, zero, zero], 1),
+        "depth": np.stack([zero, zero, z], 1),
+        "jaw_width": _bump(vertices, (0.0, JAW_Y, 0.0), (1.0, 0.025, 1.0), front_only=False)
+        * np.stack([x, zero, 0.3 * z], 1),
+        "cheekbones": _bump(vertices, (0.0, CHEEK_Y, 0.0), (1.0, 0.015, 1.0))
+        * np.stack([0.6 * x, zero, 0.4 * z], 1),
+        "nose_size": _bump(vertices, (0.0, NOSE_Y, 0.1), (0.015, 0.02, 1.0))
+        * np.stack([0.5 * x, zero, np.full_like(x, 0.025)], 1),
+        "lip_fullness": _bump(vertices, (0.0, MOUTH_Y, 0.1), (0.025, 0.008, 1.0))
+        * np.stack([zero, zero, np.full_like(x, 0.012)], 1),
+        "eye_size": eyes * (vertices - eye_centers) * np.array([1.0, 1.0, 0.0]),
+        "eye_spacing": eyes * np.stack([np.sign(x) * 0.02, zero, zero], 1),
+    }
+    return np.stack([deltas[name] for name in MORPH_NAMES])
+
+
+def _procedural_base():
+    rings, segments = MESH_RINGS, MESH_SEGMENTS
+    vertices = _lathe(MALE_PROFILE, rings, segments)
+    female = _lathe(FEMALE_PROFILE, rings, segments)
+    faces, uvs, seam = _grid_topology(rings, segments)
+    deltas = _procedural_deltas(vertices, female)
+    return vertices, faces, uvs, deltas, MORPH_NAMES, seam
+
+
+def _load_npz(path):
+    data = np.load(path)
+    vertices = data["vertices"]
+    deltas = data["deltas"].reshape(-1, len(vertices), 3)
+    seam = (data["seam_a"], data["seam_b"]) if "seam_a" in data else (np.empty(0, int), np.empty(0, int))
+    return vertices, data["faces"], data["uvs"], deltas, tuple(str(n) for n in data["morph_names"]), seam
+
+
+def _frozen(array, dtype):
+    array = np.ascontiguousarray(array, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def _accumulate(face_vectors, faces, n_verts, seam=None):
+    """Sum per-face vectors ([B, F, 3]) onto their corner vertices -> [B, V, 3]"""
+    count = face_vectors.shape[0]
+    # One bincount per axis for the whole batch: item i's vertex ids are offset by i * V
+    corners = (faces.reshape(1, -1) + (np.arange(count) * n_verts)[:, None]).ravel()
+    acc = np.empty((count * n_verts, 3), dtype=face_vectors.dtype)
+    for axis in range(3):
+        acc[:, axis] = np.bincount(corners, weights=np.repeat(face_vectors[..., axis], 3, axis=1).ravel(),
+                                   minlength=count * n_verts)
+    acc = acc.reshape(count, n_verts, 3)
+
+    # Duplicated seam vertices share one normal so the UV seam stays invisible
+    if seam is not None and len(seam[0]):
+        shared = acc[:, seam[0]] + acc[:, seam[1]]
+        acc[:, seam[0]] = shared
+        acc[:, seam[1]] = shared
+    return acc
+
+
+def _normalize(acc):
+    length = np.linalg.norm(acc, axis=-1, keepdims=True)
+    return np.divide(acc, length, out=np.zeros_like(acc), where=length > 0).astype(np.float32, copy=False)
+
+
+def _normal_basis(vertices, deltas, faces, seam):
+    """
+    Precomputed normals for the morph space.
+
+    Edges are linear in the weights (e = E0 + sum w_m E_m), so the face
+    cross products, and their per-vertex sums, are quadratic:
+
+        normals(w) = sum over pairs m <= k of  w~_m w~_k N_mk,   w~ = [1, w]
+
+    N is [P, V*3] with P = (M+1)(M+2)/2; normals for a whole batch are then
+    one [B, P] @ [P, V*3] product instead of per-variant cross products.
+    """
+    n_verts = len(vertices)
+    parts = np.concatenate([vertices[None], deltas.reshape(len(deltas), n_verts, 3)]).astype(np.float64)
+    e1 = parts[:, faces[:, 1]] - parts[:, faces[:, 0]]
+    e2 = parts[:, faces[:, 2]] - parts[:, faces[:, 0]]
+
+    rows, cols = np.triu_indices(len(parts))
+    basis = np.empty((len(rows), n_verts * 3), dtype=np.float32)
+    # Loops over morph pairs only; each pair is a vectorized pass over all faces
+    for p, (m, k) in enumerate(zip(rows, cols)):
+        face_n = np.cross(e1[m], e2[k])
+        if m != k:
+            face_n += np.cross(e1[k], e2[m])
+        basis[p] = _accumulate(face_n[None], faces, n_verts, seam).reshape(-1)
+    return basis
+
+
+_base_lock = threading.Lock()
+
+
+def load_base_mesh():
+    """Base mesh and morph stack, built/loaded once per process"""
+    # Locked so a request racing prewarm_base_mesh() waits instead of
+    # building the normal basis a second time
+    with _base_lock:
+        return _load_base_mesh()
+
+
+def prewarm_base_mesh():
+    """Load the base mesh and normal basis on a daemon thread; returns the thread"""
+    thread = threading.Thread(target=load_base_mesh, name="avatar-mesh-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+@lru_cache(maxsize=None)
+def _load_base_mesh():
+    if AVATAR_BASE_MESH and os.path.exists(AVATAR_BASE_MESH):
+        vertices, faces, uvs, deltas, names, seam = _load_npz(AVATAR_BASE_MESH)
+    else:
+        vertices, faces, uvs, deltas, names, seam = _procedural_base()
+
+    faces = _frozen(faces, np.uint32)
+    seam = (np.asarray(seam[0]), np.asarray(seam[1]))
+    deltas = np.reshape(deltas, (len(names), -1))
+
+    pairs = (len(names) + 1) * (len(names) + 2) // 2
+    basis = None
+    if pairs * deltas.shape[1] * 4 <= NORMAL_BASIS_MAX_MB * 1024 * 1024:
+        basis = _frozen(_normal_basis(vertices, deltas, faces, seam), np.float32)
+
+    return BaseMesh(
+        vertices=_frozen(vertices, np.float32),
+        faces=faces,
+        uvs=_frozen(uvs, np.float32),
+        deltas=_frozen(deltas, np.float32),
+        morph_names=tuple(names),
+        seam=seam,
+        normal_basis=basis,
+    )
+
+
+def gender_weight(value):
+    """
+    Frontend gender -> blend weight, male base (0.0) .. female (1.0).
+
+    Accepts "male" / "female" (any case) or the studio slider's 0..100 scale,
+    where 0 is female and 100 is male. Anything else raises ValueError.
+    """
+    if value is None:
+        return 0.0
+    if isinstance(value, str):
+        key = value.strip().lower()
+        if key == "male":
+            return 0.0
+        if key == "female":
+            return 1.0
+        raise ValueError(f"Unknown gender: {value!r} (expected 'male', 'female' or 0..100)")
+    return float(np.clip(1.0 - float(value) / 100.0, 0.0, 1.0))
+
+
+def morph_weights(params, morph_names=MORPH_NAMES):
+    """AvatarMorphParams -> float32 [M] weights in delta-stack order"""
+    weights = np.zeros(len(morph_names), dtype=np.float32)
+    for i, name in enumerate(morph_names):
+        value = getattr(params, name, None)
+        if name == "gender":
+            weights[i] = gender_weight(value)
+        elif value is not None:
+            weights[i] = np.clip(float(value), *MORPH_RANGE) - 1.0
+    return weights
+
+
+def blend(base, weights):
+    """base + weights @ deltas; weights [M] -> [V, 3], [B, M] -> [B, V, 3]"""
+    weights = np.asarray(weights, dtype=np.float32)
+    flat = weights @ base.deltas
+    flat += base.vertices.reshape(-1)
+    return flat.reshape(*weights.shape[:-1], -1, 3)
+
+
+def vertex_normals(vertices, faces, seam=None):
+    """Area-weighted normals for [V, 3] or [B, V, 3] vertices, summed with bincount (no Python loops)"""
+    batched = vertices.ndim == 3
+    verts = vertices if batched else vertices[None]
+
+    v0 = verts[:, faces[:, 0]]
+    face_n = np.cross(verts[:, faces[:, 1]] - v0, verts[:, faces[:, 2]] - v0)
+    normals = _normalize(_accumulate(face_n, faces, verts.shape[1], seam))
+    return normals if batched else normals[0]
+
+
+def blend_normals(base, weights, vertices=None):
+    """Normals for blend(base, weights): via the normal basis, else from the blended vertices"""
+    weights = np.asarray(weights, dtype=np.float32)
+    if base.normal_basis is None:
+        return vertex_normals(blend(base, weights) if vertices is None else vertices, base.faces, base.seam)
+
+    w = np.concatenate([np.ones(weights.shape[:-1] + (1,), dtype=np.float32), weights], axis=-1)
+    rows, cols = np.triu_indices(w.shape[-1])
+    acc = (w[..., rows] * w[..., cols]) @ base.normal_basis
+    return _normalize(acc.reshape(*weights.shape[:-1], -1, 3))
+
+
+def build_mesh(params):
+    """Blend one AvatarMorphParams into an AvatarMesh"""
+    base = load_base_mesh()
+    weights = morph_weights(params, base.morph_names)
+    vertices = blend(base, weights)
+    normals = blend_normals(base, weights, vertices)
+    return AvatarMesh(vertices=vertices, normals=normals, faces=base.faces, uvs=base.uvs)
+
+
+def build_meshes(params_list, chunk_size=None):
+    """
+    Blend many AvatarMorphParams at once: one [B, M] @ [M, V*3] product
+    (and one for normals) per chunk of chunk_size variants, which bounds
+    the [B, V, 3] working set.
+    """
+    base = load_base_mesh()
+    chunk_size = chunk_size or BATCH_CHUNK
+    weights = np.zeros((len(params_list), len(base.morph_names)), dtype=np.float32)
+    for i, params in enumerate(params_list):
+        weights[i] = morph_weights(params, base.morph_names)
+
+    meshes = []
+    for start in range(0, len(weights), chunk_size):
+        chunk = weights[start:start + chunk_size]
+        vertices = blend(base, chunk)
+        normals = blend_normals(base, chunk, vertices)
+        meshes.extend(
+            AvatarMesh(vertices=v, normals=n, faces=base.faces, uvs=base.uvs)
+            for v, n in zip(vertices, normals)
+        )
+    return meshes
@@ -0,0 +1,8 @@
+"""
+YOcreator shared runtime
+========================
+
+Process-wide state shared by the voice, avatar and video engines and the
+GPU worker. Always import as ``common.*`` (with server/python on sys.path)
+so every caller sees the same module instance.
+"""
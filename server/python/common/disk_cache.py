@@ -0,0 +1,157 @@
+# ======================================
+# YOcreator — Content-Addressed Disk Cache
+# server/python/common/disk_cache.py
+# ======================================
+# Size-bounded LRU cache of files (or directories) on local disk, keyed by
+# a hash of everything that determines the content. Entries are produced
+# into a temp path and renamed into place, so concurrent readers, threads
+# and worker processes never see a partial entry.
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+TMP_PREFIX = ".tmp-"
+
+
+def make_key(*parts):
+    """Stable sha256 over JSON-serializable key parts"""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _entry_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(path)
+            for f in files
+        )
+    return os.path.getsize(path)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class DiskCache:
+    """
+    LRU cache of files keyed by content hash.
+
+    Recency is the entry's mtime, refreshed on every hit, so it survives
+    restarts and is shared by every process using the same directory.
+    """
+
+    def __init__(self, root, max_bytes, name="cache"):
+        self.root = os.path.abspath(root)
+        self.max_bytes = int(max_bytes)
+        self.name = name
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def path_for(self, key, suffix=""):
+        return os.path.join(self.root, f"{key}{suffix}")
+
+    def get(self, key, suffix=""):
+        """Path of a cached entry (refreshing its recency), or None"""
+        path = self.path_for(key, suffix)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                path = None
+        else:
+            path = None
+
+        with self._lock:
+            if path:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return path
+
+    def tmp_path(self, suffix=""):
+        """Private path inside the cache root for building an entry"""
+        return os.path.join(self.root, f"{TMP_PREFIX}{uuid.uuid4().hex}{suffix}")
+
+    def publish(self, tmp_path, key, suffix=""):
+        """Atomically move a finished tmp_path into place as the entry for key"""
+        final_path = self.path_for(key, suffix)
+        if os.path.isdir(final_path):
+            # Same key, same content: keep the entry other readers may have
+            # open (a directory cannot be replaced atomically) and drop ours
+            _remove(tmp_path)
+            os.utime(final_path)
+            return final_path
+        os.replace(tmp_path, final_path)
+
+        with self._lock:
+            self.stores += 1
+        self.evict(keep=final_path)
+        return final_path
+
+    def put(self, key, producer, suffix=""):
+        """
+        Create an entry by calling producer(tmp_path), then publish it.
+
+        producer writes a file or directory at tmp_path. If it raises,
+        nothing is published and the temp output is removed.
+        """
+        tmp_path = self.tmp_path(suffix)
+        try:
+            producer(tmp_path)
+            return self.publish(tmp_path, key, suffix)
+        finally:
+            if os.path.exists(tmp_path):
+                _remove(tmp_path)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if name.startswith(TMP_PREFIX):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    entries.append((os.path.getmtime(path), _entry_size(path), path))
+                except FileNotFoundError:
+                    continue
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                _remove(path)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "max_bytes": self.max_bytes,
+            }
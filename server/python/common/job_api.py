@@ -0,0 +1,243 @@
+# ======================================
+# YOcreator — Async Job API
+# server/python/common/job_api.py
+# ======================================
+# Turns a blocking runner(payload) into an asynchronous HTTP job API:
+#
+#   POST /generate               202 {"job_id", "status_url", ...}; 429 when full
+#                                ?wait=N  hold up to N s and return the result if done
+#   GET  /jobs/<id>              status; ?wait=N long-polls until it changes
+#   GET  /jobs/<id>/result       200 {"path"} | 202 pending | 500 {"error"}
+#   GET  /jobs/<id>/events       server-sent events, one per status change
+#
+# Jobs run on a bounded thread pool; at most workers + queue_size jobs are
+# accepted at once, so a slow provider backs up into 429s instead of
+# tying up HTTP workers.
+
+import os
+import time
+import uuid
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = max(1, int(os.getenv("JOB_API_WORKERS", "4")))
+JOB_QUEUE_SIZE = max(0, int(os.getenv("JOB_API_QUEUE_SIZE", "32")))
+# Finished jobs are kept this long for status/result lookups
+JOB_RESULT_TTL = float(os.getenv("JOB_API_RESULT_TTL", "3600"))
+# Upper bound for ?wait= long polls and the SSE heartbeat interval
+MAX_WAIT_SECONDS = 60.0
+SSE_HEARTBEAT_SECONDS = 15.0
+
+TERMINAL = ("completed", "error")
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when no more jobs can be accepted"""
+
+
+class JobQueue:
+    """Bounded executor plus an in-memory table of job states"""
+
+    def __init__(self, runner, name="jobs", workers=None, queue_size=None, ttl=JOB_RESULT_TTL):
+        self.runner = runner
+        self.name = name
+        self.workers = workers or JOB_WORKERS
+        self.capacity = self.workers + (JOB_QUEUE_SIZE if queue_size is None else queue_size)
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"api-{name}")
+
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._active = 0
+
+    def submit(self, payload):
+        """Accept a job and return its snapshot; raises QueueFull at capacity"""
+        with self._cond:
+            self._prune()
+            if self._active >= self.capacity:
+                raise QueueFull(f"{self.name} queue is full ({self.capacity} jobs)")
+            job = {
+                "id": str(uuid.uuid4()),
+                "status": "queued",
+                "version": 0,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            self._active += 1
+            snapshot = dict(job)
+
+        self.executor.submit(self._run, job["id"], payload)
+        return snapshot
+
+    def _run(self, job_id, payload):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = self.runner(payload)
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status="completed", result=result, finished_at=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["version"] += 1
+            if job["status"] in TERMINAL:
+                self._active -= 1
+            self._cond.notify_all()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in TERMINAL and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout, since_version=None):
+        """
+        Block until the job's version passes since_version (any change when
+        None means "until finished"), or timeout. Returns the snapshot or None.
+        """
+        deadline = time.monotonic() + max(0.0, min(timeout, MAX_WAIT_SECONDS))
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["status"] in TERMINAL:
+                    return dict(job)
+                if since_version is not None and job["version"] > since_version:
+                    return dict(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return dict(job)
+                self._cond.wait(remaining)
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"name": self.name, "workers": self.workers, "capacity": self.capacity,
+                    "active": self._active, "jobs": counts}
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def public_job(job, prefix=""):
+    """Job snapshot as returned to clients"""
+    body = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "version": job["version"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "status_url": f"{prefix}/jobs/{job['id']}",
+        "result_url": f"{prefix}/jobs/{job['id']}/result",
+        "events_url": f"{prefix}/jobs/{job['id']}/events",
+    }
+    if job["status"] == "completed":
+        body["path"] = job["result"]
+    if job["status"] == "error":
+        body["error"] = job["error"]
+    return body
+
+
+def job_blueprint(name, queue, url_prefix=None):
+    """Flask blueprint exposing `queue` as the async job API (see module header)"""
+    from flask import Blueprint, Response, jsonify, request
+
+    bp = Blueprint(name, __name__, url_prefix=url_prefix)
+    prefix = url_prefix or ""
+
+    def _wait_arg():
+        try:
+            return float(request.args.get("wait", 0))
+        except ValueError:
+            return 0.0
+
+    @bp.route("/generate", methods=["POST"])
+    def generate():
+        payload = request.get_json(silent=True) or {}
+        try:
+            job = queue.submit(payload)
+        except QueueFull as e:
+            response = jsonify({"error": str(e)})
+            response.status_code = 429
+            response.headers["Retry-After"] = "5"
+            return response
+
+        wait = _wait_arg()
+        if wait > 0:
+            job = queue.wait(job["id"], wait)
+        status = 200 if job["status"] in TERMINAL else 202
+        response = jsonify(public_job(job, prefix))
+        response.status_code = status
+        response.headers["Location"] = f"{prefix}/jobs/{job['id']}"
+        return response
+
+    @bp.route("/jobs/<job_id>", methods=["GET"])
+    def status(job_id):
+        job = queue.get(job_id)
+        wait = _wait_arg()
+        if job is not None and wait > 0:
+            # Long-poll for the next change after ?since= (default: the current version)
+            since = request.args.get("since", job["version"], type=int)
+            job = queue.wait(job_id, wait, since)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(public_job(job, prefix))
+
+    @bp.route("/jobs/<job_id>/result", methods=["GET"])
+    def result(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        if job["status"] == "completed":
+            return jsonify({"path": job["result"]})
+        if job["status"] == "error":
+            return jsonify({"error": job["error"]}), 500
+        return jsonify(public_job(job, prefix)), 202
+
+    @bp.route("/jobs/<job_id>/events", methods=["GET"])
+    def events(job_id):
+        if queue.get(job_id) is None:
+            return jsonify({"error": "Job not found"}), 404
+
+        def stream():
+            # Current state first, then one event per change
+            job = queue.get(job_id)
+            version = None
+            while job is not None:
+                if job["version"] == version:
+                    yield ": keep-alive\n\n"
+                else:
+                    version = job["version"]
+                    yield f"event: {job['status']}\ndata: {json.dumps(public_job(job, prefix))}\n\n"
+                    if job["status"] in TERMINAL:
+                        return
+                job = queue.wait(job_id, SSE_HEARTBEAT_SECONDS, version)
+
+        return Response(stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @bp.route("/jobs", methods=["GET"])
+    def queue_stats():
+        return jsonify(queue.stats())
+
+    return bp
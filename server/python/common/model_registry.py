@@ -0,0 +1,118 @@
+# ======================================
+# YOcreator — Model Registry
+# server/python/common/model_registry.py
+# ======================================
+# Keeps heavy models (InsightFace, Wav2Lip, TTS, video) warm for the life of
+# a worker process. Engines register a loader once at import time; the model
+# is built on first use, can be preloaded at worker start, and can be
+# unloaded explicitly to free memory.
+
+import time
+import threading
+
+
+class ModelRegistry:
+    """Lazy, thread-safe, process-wide cache of loaded models"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._models = {}
+        self._load_locks = {}
+        self._metrics = {}
+
+    def register(self, name, loader, unloader=None):
+        """
+        Register a model loader.
+
+        Args:
+            name: Registry key, e.g. "insightface"
+            loader: Zero-argument callable returning the loaded model
+            unloader: Optional callable(model) run on unload
+        """
+        with self._lock:
+            self._loaders[name] = (loader, unloader)
+            self._load_locks.setdefault(name, threading.Lock())
+            self._metrics.setdefault(name, {
+                "loads": 0,
+                "last_load_seconds": None,
+                "total_load_seconds": 0.0,
+                "warm_hits": 0,
+                "unloads": 0,
+                "loaded": False,
+            })
+
+    def get(self, name):
+        """Return the model, loading it on first use"""
+        if name in self._models:
+            with self._lock:
+                self._metrics[name]["warm_hits"] += 1
+            return self._models[name]
+
+        if name not in self._loaders:
+            raise KeyError(f"Model not registered: {name}")
+
+        # Per-model lock: concurrent first callers wait for one load
+        with self._load_locks[name]:
+            if name in self._models:
+                with self._lock:
+                    self._metrics[name]["warm_hits"] += 1
+                return self._models[name]
+
+            loader, _ = self._loaders[name]
+            started = time.perf_counter()
+            model = loader()
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._models[name] = model
+                m = self._metrics[name]
+                m["loads"] += 1
+                m["last_load_seconds"] = round(elapsed, 4)
+                m["total_load_seconds"] = round(m["total_load_seconds"] + elapsed, 4)
+                m["loaded"] = True
+
+            print(f"Model loaded: {name} ({elapsed:.2f}s)")
+            return model
+
+    def preload(self, names=None):
+        """Load the given models (default: all registered) and return failures"""
+        failed = {}
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                failed[name] = str(e)
+                print(f"Model preload failed: {name}: {e}")
+        return failed
+
+    def unload(self, name=None):
+        """Drop one model (or all of them when name is None)"""
+        names = [name] if name else list(self._models)
+        for n in names:
+            if n not in self._load_locks:
+                continue
+            with self._load_locks[n]:
+                if n not in self._models:
+                    continue
+                model = self._models.pop(n)
+                _, unloader = self._loaders.get(n, (None, None))
+                if unloader:
+                    unloader(model)
+                with self._lock:
+                    self._metrics[n]["unloads"] += 1
+                    self._metrics[n]["loaded"] = False
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def registered(self):
+        return list(self._loaders)
+
+    def metrics(self):
+        """Load-time metrics per model; loads > 1 means the model went cold again"""
+        with self._lock:
+            return {name: dict(m) for name, m in self._metrics.items()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,114 @@
+# ======================================
+# YOcreator — Provider HTTP Client
+# server/python/common/provider_client.py
+# ======================================
+# One pooled requests.Session per process for calls to external providers
+# (ElevenLabs, OpenAI, ...). Connections are kept alive across jobs, so a
+# request does not pay a new TCP + TLS handshake, and retries/timeouts are
+# configured in one place.
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "5"))
+# Max wait between bytes, not for the whole response, so long audio can stream
+READ_TIMEOUT = float(os.getenv("PROVIDER_READ_TIMEOUT", "60"))
+RETRIES = int(os.getenv("PROVIDER_RETRIES", "3"))
+
+CHUNK_SIZE = 64 * 1024
+
+# 5xx is retried for these only; a POST that failed with 5xx may already
+# have been processed (and billed), so POSTs are retried on 429 alone
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+class _ProviderRetry(Retry):
+    """Retry that limits non-idempotent methods to 429 (and connect errors)"""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() not in IDEMPOTENT_METHODS and status_code != 429:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class ProviderClient:
+    """Keep-alive session with retry on connect errors, 429 and (GET only) 5xx"""
+
+    def __init__(self, pool_size=POOL_SIZE, retries=RETRIES,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        retry = _ProviderRetry(
+            total=retries,
+            connect=retries,
+            # A read error means the provider may already have billed us
+            read=0,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def open_stream(self, method, url, **kwargs):
+        """
+        Send a request with stream=True and return the response once the
+        status is known. Raises with the provider's error body on non-200.
+        """
+        response = self.request(method, url, stream=True, **kwargs)
+        if response.status_code != 200:
+            body = response.text
+            response.close()
+            raise Exception(f"{url} error: {response.status_code} - {body}")
+        return response
+
+
+def iter_body(response, chunk_size=CHUNK_SIZE):
+    """Yield a streamed response body in chunks and release the connection"""
+    with response:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                yield chunk
+
+
+def write_body(response, out_path, chunk_size=CHUNK_SIZE):
+    """Write a streamed response body to disk chunk by chunk; returns bytes written"""
+    written = 0
+    with open(out_path, "wb") as f:
+        for chunk in iter_body(response, chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide ProviderClient"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProviderClient()
+    return _client
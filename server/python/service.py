@@ -0,0 +1,154 @@
+# ======================================
+# YOcreator — Consolidated Media Service
+# server/python/service.py
+# ======================================
+# One process for the voice, avatar and video APIs and the GPU worker loop,
+# so models (common.model_registry) and caches are loaded once per node
+# instead of once per service.
+#
+#   python service.py --roles voice,avatar,worker --port 5000
+#   MEDIA_ROLES=voice,video python service.py
+#
+# HTTP roles mount the async job API (common/job_api.py) under /<role>, e.g.
+# POST /voice/generate. The worker role runs the RunPod polling loop on a
+# background thread with thread pools only.
+
+import os
+import sys
+import argparse
+import importlib
+import importlib.util
+import threading
+
+_SERVER_PY = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.abspath(os.path.join(_SERVER_PY, "../.."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.job_api import JobQueue, job_blueprint
+from common.model_registry import registry
+
+# role -> (engine module, runner name); "worker" is the polling loop
+HTTP_ROLES = {
+    "voice": ("voice.inference", "run_voice"),
+    "avatar": ("avatar.render", "run_avatar"),
+    "video": ("video.generate", "run_video"),
+}
+ALL_ROLES = list(HTTP_ROLES) + ["worker"]
+
+# Engine modules the worker loop uses; imported up front so the worker and
+# the HTTP roles get the same module instances
+WORKER_ENGINES = ["voice.inference", "avatar.create_avatar", "avatar.lipsync"]
+
+MEDIA_ROLES = os.getenv("MEDIA_ROLES", ",".join(ALL_ROLES))
+SERVICE_HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "5000"))
+WORKER_PATH = os.path.join(_REPO_ROOT, "workers/runpod/worker.py")
+
+
+def parse_roles(value):
+    """Comma-separated role list ("all" for every role) -> ordered list"""
+    names = [r.strip().lower() for r in value.split(",") if r.strip()]
+    if names == ["all"]:
+        return list(ALL_ROLES)
+    unknown = [r for r in names if r not in ALL_ROLES]
+    if unknown:
+        raise ValueError(f"Unknown roles: {', '.join(unknown)} (expected {', '.join(ALL_ROLES)})")
+    return [r for r in ALL_ROLES if r in names]
+
+
+def _share_engine_modules():
+    """
+    Alias loaded engine modules under server.python.* as well.
+
+    The worker imports server.python.avatar.create_avatar etc. first; without
+    the aliases those would be second copies with their own caches.
+    """
+    for name, module in list(sys.modules.items()):
+        if name.split(".")[0] in HTTP_ROLES and module is not None:
+            sys.modules.setdefault(f"server.python.{name}", module)
+
+
+def _load_worker():
+    """Import workers/runpod/worker.py (server/python/worker.py shadows the name)"""
+    if _REPO_ROOT not in sys.path:
+        sys.path.append(_REPO_ROOT)
+    spec = importlib.util.spec_from_file_location("runpod_worker", WORKER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_worker(worker):
+    """Run the polling loop on a daemon thread with thread-only pools"""
+    from scheduler import thread_pools
+
+    thread = threading.Thread(target=worker.run_polling_worker, args=(thread_pools(),),
+                              name="media-worker", daemon=True)
+    thread.start()
+    return thread
+
+
+def create_app(roles):
+    """Flask app with the job API of every enabled HTTP role plus /health"""
+    from flask import Flask, jsonify
+
+    app = Flask(__name__)
+    queues = {}
+    for role in roles:
+        if role not in HTTP_ROLES:
+            continue
+        module_name, runner_name = HTTP_ROLES[role]
+        runner = getattr(importlib.import_module(module_name), runner_name)
+        queues[role] = JobQueue(runner, name=role)
+        app.register_blueprint(job_blueprint(role, queues[role], url_prefix=f"/{role}"))
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify({
+            "roles": roles,
+            "queues": {role: q.stats() for role, q in queues.items()},
+            "models": registry.metrics(),
+        })
+
+    app.config["JOB_QUEUES"] = queues
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YOcreator consolidated media service")
+    parser.add_argument("--roles", default=MEDIA_ROLES,
+                        help=f"Comma-separated subset of {', '.join(ALL_ROLES)} (default MEDIA_ROLES or all)")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args(argv)
+
+    roles = parse_roles(args.roles)
+    if not roles:
+        parser.error("No roles enabled")
+    print(f"Starting YOcreator media service (roles: {', '.join(roles)})")
+
+    app = create_app(roles)
+    if "avatar" in roles:
+        # Parametric avatar mesh and normal basis, built off the request path
+        from avatar_engine import prewarm as prewarm_avatar_engine
+        prewarm_avatar_engine()
+    if "worker" in roles:
+        for name in WORKER_ENGINES:
+            importlib.import_module(name)
+    _share_engine_modules()
+
+    if "worker" in roles:
+        worker = _load_worker()
+        if not any(r in HTTP_ROLES for r in roles):
+            # Worker-only node: no HTTP server, the loop owns the main thread
+            from scheduler import thread_pools
+            worker.run_polling_worker(thread_pools())
+            return
+        start_worker(worker)
+
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+GLB export: decode the written file the way a viewer would and compare it
+with the source mesh.
+"""
+
+import io
+import os
+import sys
+import json
+import struct
+
+import numpy as np
+import pytest
+
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from avatar_engine.generator import parse_frontend_params
+from avatar_engine.glb import write_glb, COMPONENT_TYPES
+from avatar_engine.mesh import build_mesh
+
+DTYPES = {code: dtype for dtype, code in COMPONENT_TYPES.items()}
+WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3}
+
+
+def _decode(data):
+    """(gltf, bin) chunks of a GLB byte string"""
+    magic, version, total = struct.unpack_from("<III", data, 0)
+    assert (magic, version, total) == (0x46546C67, 2, len(data))
+    json_len, _ = struct.unpack_from("<II", data, 12)
+    gltf = json.loads(data[20:20 + json_len])
+    bin_len, _ = struct.unpack_from("<II", data, 20 + json_len)
+    start = 28 + json_len
+    return gltf, data[start:start + bin_len]
+
+
+def _accessor(gltf, blob, index):
+    """Accessor as float array, normalized integers mapped to [-1, 1] / [0, 1]"""
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    dtype = DTYPES[accessor["componentType"]]
+    width = WIDTHS[accessor["type"]]
+    stride = view.get("byteStride", dtype.itemsize * width) // dtype.itemsize
+    raw = np.frombuffer(blob, dtype=dtype, offset=view["byteOffset"],
+                        count=accessor["count"] * stride).reshape(-1, stride)[:, :width]
+    values = raw.astype(np.float64)
+    if accessor.get("normalized"):
+        values = np.maximum(values / np.iinfo(dtype).max, -1.0)
+    return values
+
+
+@pytest.fixture(scope="module")
+def mesh():
+    return build_mesh(parse_frontend_params({"gender": 40, "height": 1.2, "faceWidth": 0.8}))
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_normals_survive_node_transform(mesh, quantize):
+    buf = io.BytesIO()
+    write_glb(buf, mesh, quantize=quantize)
+    gltf, blob = _decode(buf.getvalue())
+
+    node = gltf["nodes"][0]
+    scale = np.asarray(node.get("scale", [1.0, 1.0, 1.0]))
+    translation = np.asarray(node.get("translation", [0.0, 0.0, 0.0]))
+    attributes = gltf["meshes"][0]["primitives"][0]["attributes"]
+
+    positions = _accessor(gltf, blob, attributes["POSITION"]) * scale + translation
+    extent = float((mesh.vertices.max(axis=0) - mesh.vertices.min(axis=0)).max())
+    assert np.abs(positions - mesh.vertices).max() <= extent * 1e-4
+
+    # Normals go through the inverse transpose of the node matrix
+    normals = _accessor(gltf, blob, attributes["NORMAL"]) / scale
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    source = mesh.normals / np.linalg.norm(mesh.normals, axis=1, keepdims=True)
+    angles = np.degrees(np.arccos(np.clip((normals * source).sum(axis=1), -1.0, 1.0)))
+    assert angles.max() < 1.5
+    assert angles.mean() < 0.5
@@ -1,13 +1,20 @@
-from flask import Flask, request, jsonify
+import os
+import sys
+
+from flask import Flask
 from inference import run_voice
 
-app = Flask(__name__)
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.job_api import JobQueue, job_blueprint
 
-@app.route("/generate", methods=["POST"])
-def generate():
-    payload = request.json
-    result = run_voice(payload)
-    return jsonify({"path": result})
+# POST /generate returns 202 + job id; see common/job_api.py for the endpoints
+jobs = JobQueue(run_voice, name="voice")
+
+app = Flask(__name__)
+app.register_blueprint(job_blueprint("voice", jobs))
 
 if __name__ == "__main__":
-    app.run(port=5002)
+    app.run(port=5002, threaded=True)
@@ -5,10 +5,24 @@
 # Supports ElevenLabs (primary) and OpenAI TTS (fallback)
 
 import os
+import re
+import sys
 import uuid
-import requests
+import wave
+import shutil
+import subprocess
+import unicodedata
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+_SERVER_PY = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _SERVER_PY not in sys.path:
+    sys.path.insert(0, _SERVER_PY)
+
+from common.disk_cache import DiskCache, make_key
+from common.provider_client import get_client, iter_body, write_body
+
 # Environment variables
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # Rachel default
@@ -17,42 +31,195 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "../../../pipeline/cache/audio")
 Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
 
+# Provider request settings (also part of the cache key)
+ELEVENLABS_MODEL_ID = "eleven_monolingual_v1"
+ELEVENLABS_VOICE_SETTINGS = {
+    "stability": 0.55,
+    "similarity_boost": 0.75,
+    "style": 0.0,
+    "use_speaker_boost": True
+}
+OPENAI_TTS_MODEL = "tts-1-hd"
+OPENAI_TTS_VOICE = "alloy"  # Options: alloy, echo, fable, onyx, nova, shimmer
+GTTS_LANG = "en"
+
+# Chunked synthesis: max characters per request (under each provider's hard
+# limit), concurrent requests, and the crossfade used when stitching
+TTS_CHUNK_CHARS = {"elevenlabs": 2500, "openai": 4000, "gtts": 3000}
+TTS_CHUNK_WORKERS = int(os.getenv("TTS_CHUNK_WORKERS", "4"))
+TTS_CROSSFADE_MS = 20
+TTS_STITCH_SAMPLE_RATE = 24000
+
+# Scripts longer than this are synthesized in chunks by synthesize_script()
+TTS_CHUNKED_MIN_CHARS = int(os.getenv("TTS_CHUNKED_MIN_CHARS", "600"))
+
+# Synthesized audio, keyed by text + voice + provider settings
+TTS_CACHE = DiskCache(
+    os.path.join(OUTPUT_DIR, "tts"),
+    max_bytes=int(os.getenv("TTS_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+    name="tts"
+)
+
+
+def normalize_text(text: str):
+    """Unicode NFC, collapse whitespace runs, keep paragraph breaks"""
+    text = unicodedata.normalize("NFC", text)
+    paragraphs = re.split(r"\n\s*\n", text.strip())
+    return "\n\n".join(" ".join(p.split()) for p in paragraphs if p.strip())
+
+
+def _tts_providers(text: str, voice_id: str, output_format: str):
+    """
+    Providers to try, in order, as
+    (name, cache key params, synth(out_path), open_stream() or None).
+    """
+    ext = "mp3" if output_format == "mp3" else "wav"
+    providers = []
+    
+    # Try ElevenLabs first (better voice cloning)
+    if ELEVENLABS_API_KEY:
+        voice = voice_id or ELEVENLABS_VOICE_ID
+        providers.append((
+            "elevenlabs",
+            {"voice_id": voice, "model_id": ELEVENLABS_MODEL_ID,
+             "voice_settings": ELEVENLABS_VOICE_SETTINGS, "output_format": ext},
+            lambda path: _synthesize_elevenlabs(text, voice, output_format, out_path=path),
+            lambda: _elevenlabs_request(text, voice, output_format)
+        ))
+    
+    # Fallback to OpenAI TTS
+    if OPENAI_API_KEY:
+        providers.append((
+            "openai",
+            {"voice_id": OPENAI_TTS_VOICE, "model_id": OPENAI_TTS_MODEL, "output_format": ext},
+            lambda path: _synthesize_openai(text, output_format, out_path=path),
+            lambda: _openai_request(text, output_format)
+        ))
+    
+    # Last resort: gTTS (free but lower quality, always mp3)
+    providers.append((
+        "gtts",
+        {"lang": GTTS_LANG, "output_format": "mp3"},
+        lambda path: _synthesize_gtts(text, out_path=path),
+        None
+    ))
+    return providers
+
+
+def tts_cache_key(text: str, provider: str, params: dict):
+    """Cache key for already-normalized text on one provider"""
+    return make_key("tts", text, provider, params)
+
 
-def synthesize_voice(text: str, voice_id: str = None, output_format: str = "wav"):
+def synthesize_voice(text: str, voice_id: str = None, output_format: str = "wav", use_cache: bool = True):
     """
     Generate speech from text using ElevenLabs or OpenAI TTS.
     
+    Results are cached under pipeline/cache/audio/tts, keyed on normalized
+    text, provider, voice, model, voice settings and format, so re-rendering
+    the same script does not call the provider again.
+    
     Args:
         text: The text to convert to speech
         voice_id: ElevenLabs voice ID (optional)
         output_format: 'wav' or 'mp3'
+        use_cache: Reuse/store cached audio (default True)
         
     Returns:
         Path to generated audio file
     """
     
-    # Try ElevenLabs first (better voice cloning)
-    if ELEVENLABS_API_KEY:
+    text = normalize_text(text)
+    providers = _tts_providers(text, voice_id, output_format)
+    
+    for i, (provider, params, synth, _) in enumerate(providers):
+        suffix = "." + params["output_format"]
+        key = tts_cache_key(text, provider, params)
+        
+        if use_cache:
+            cached = TTS_CACHE.get(key, suffix)
+            if cached:
+                print(f"TTS cache hit ({provider}): {cached}")
+                return cached
+        
         try:
-            return _synthesize_elevenlabs(text, voice_id or ELEVENLABS_VOICE_ID, output_format)
+            if use_cache:
+                path = TTS_CACHE.put(key, synth, suffix)
+                print(f"TTS cached ({provider}): {path}")
+                return path
+            return synth(os.path.join(OUTPUT_DIR, f"{uuid.uuid4()}{suffix}"))
         except Exception as e:
-            print(f"ElevenLabs failed: {e}, trying OpenAI...")
+            if i == len(providers) - 1:
+                raise
+            print(f"{provider} TTS failed: {e}, trying {providers[i + 1][0]}...")
+
+
+def stream_voice(text: str, voice_id: str = None, output_format: str = "wav", chunk_size: int = 64 * 1024):
+    """
+    Generate speech as an iterator of audio byte chunks.
     
-    # Fallback to OpenAI TTS
-    if OPENAI_API_KEY:
+    Chunks are yielded as they arrive from the provider, so downstream
+    stages can start before the download finishes. The audio is written to
+    the TTS cache at the same time and published once complete; a cached
+    result is streamed straight from disk.
+    """
+    
+    text = normalize_text(text)
+    providers = _tts_providers(text, voice_id, output_format)
+    
+    for i, (provider, params, synth, open_stream) in enumerate(providers):
+        suffix = "." + params["output_format"]
+        key = tts_cache_key(text, provider, params)
+        
+        cached = TTS_CACHE.get(key, suffix)
+        if cached:
+            yield from _iter_file(cached, chunk_size)
+            return
+        
         try:
-            return _synthesize_openai(text, output_format)
+            if open_stream is None:
+                path = TTS_CACHE.put(key, synth, suffix)
+                yield from _iter_file(path, chunk_size)
+                return
+            response = open_stream()
         except Exception as e:
-            print(f"OpenAI TTS failed: {e}")
-    
-    # Last resort: gTTS (free but lower quality)
-    return _synthesize_gtts(text)
+            if i == len(providers) - 1:
+                raise
+            print(f"{provider} TTS failed: {e}, trying {providers[i + 1][0]}...")
+            continue
+        
+        # Once bytes have been yielded there is no falling back to another provider
+        tmp_path = TTS_CACHE.tmp_path(suffix)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter_body(response, chunk_size):
+                    f.write(chunk)
+                    yield chunk
+            TTS_CACHE.publish(tmp_path, key, suffix)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return
 
 
-def _synthesize_elevenlabs(text: str, voice_id: str, output_format: str = "wav"):
-    """Generate speech using ElevenLabs API"""
+def _iter_file(path: str, chunk_size: int):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def tts_cache_stats():
+    """Hit/miss counters for the TTS cache"""
+    return TTS_CACHE.stats()
+
+
+def _elevenlabs_request(text: str, voice_id: str, output_format: str = "wav"):
+    """Start an ElevenLabs synthesis and return the streaming response"""
     
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream"
     
     headers = {
         "xi-api-key": ELEVENLABS_API_KEY,
@@ -62,33 +229,33 @@ def _synthesize_elevenlabs(text: str, voice_id: str, output_format: str = "wav")
     
     payload = {
         "text": text,
-        "model_id": "eleven_monolingual_v1",
-        "voice_settings": {
-            "stability": 0.55,
-            "similarity_boost": 0.75,
-            "style": 0.0,
-            "use_speaker_boost": True
-        }
+        "model_id": ELEVENLABS_MODEL_ID,
+        "voice_settings": ELEVENLABS_VOICE_SETTINGS
     }
     
-    response = requests.post(url, json=payload, headers=headers, timeout=60)
+    try:
+        return get_client().open_stream("POST", url, json=payload, headers=headers)
+    except Exception as e:
+        raise Exception(f"ElevenLabs API error: {e}")
+
+
+def _synthesize_elevenlabs(text: str, voice_id: str, output_format: str = "wav", out_path: str = None):
+    """Generate speech using ElevenLabs API"""
     
-    if response.status_code != 200:
-        raise Exception(f"ElevenLabs API error: {response.status_code} - {response.text}")
+    response = _elevenlabs_request(text, voice_id, output_format)
     
-    file_id = str(uuid.uuid4())
-    ext = "mp3" if output_format == "mp3" else "wav"
-    out_path = os.path.join(OUTPUT_DIR, f"{file_id}.{ext}")
+    if out_path is None:
+        ext = "mp3" if output_format == "mp3" else "wav"
+        out_path = os.path.join(OUTPUT_DIR, f"{uuid.uuid4()}.{ext}")
     
-    with open(out_path, "wb") as f:
-        f.write(response.content)
+    write_body(response, out_path)
     
     print(f"ElevenLabs voice generated: {out_path}")
     return out_path
 
 
-def _synthesize_openai(text: str, output_format: str = "wav"):
-    """Generate speech using OpenAI TTS API"""
+def _openai_request(text: str, output_format: str = "wav"):
+    """Start an OpenAI TTS synthesis and return the streaming response"""
     
     url = "https://api.openai.com/v1/audio/speech"
     
@@ -98,29 +265,34 @@ def _synthesize_openai(text: str, output_format: str = "wav"):
     }
     
     payload = {
-        "model": "tts-1-hd",
+        "model": OPENAI_TTS_MODEL,
         "input": text,
-        "voice": "alloy",  # Options: alloy, echo, fable, onyx, nova, shimmer
+        "voice": OPENAI_TTS_VOICE,
         "response_format": "mp3" if output_format == "mp3" else "wav"
     }
     
-    response = requests.post(url, json=payload, headers=headers, timeout=60)
+    try:
+        return get_client().open_stream("POST", url, json=payload, headers=headers)
+    except Exception as e:
+        raise Exception(f"OpenAI TTS error: {e}")
+
+
+def _synthesize_openai(text: str, output_format: str = "wav", out_path: str = None):
+    """Generate speech using OpenAI TTS API"""
     
-    if response.status_code != 200:
-        raise Exception(f"OpenAI TTS error: {response.status_code} - {response.text}")
+    response = _openai_request(text, output_format)
     
-    file_id = str(uuid.uuid4())
-    ext = "mp3" if output_format == "mp3" else "wav"
-    out_path = os.path.join(OUTPUT_DIR, f"{file_id}.{ext}")
+    if out_path is None:
+        ext = "mp3" if output_format == "mp3" else "wav"
+        out_path = os.path.join(OUTPUT_DIR, f"{uuid.uuid4()}.{ext}")
     
-    with open(out_path, "wb") as f:
-        f.write(response.content)
+    write_body(response, out_path)
     
     print(f"OpenAI TTS voice generated: {out_path}")
     return out_path
 
 
-def _synthesize_gtts(text: str):
+def _synthesize_gtts(text: str, out_path: str = None):
     """Fallback: Generate speech using Google TTS (free)"""
     
     try:
@@ -128,16 +300,225 @@ def _synthesize_gtts(text: str):
     except ImportError:
         raise Exception("No TTS engine available. Install gtts or provide API keys.")
     
-    file_id = str(uuid.uuid4())
-    out_path = os.path.join(OUTPUT_DIR, f"{file_id}.mp3")
+    if out_path is None:
+        out_path = os.path.join(OUTPUT_DIR, f"{uuid.uuid4()}.mp3")
     
-    tts = gTTS(text=text, lang="en")
+    tts = gTTS(text=text, lang=GTTS_LANG)
     tts.save(out_path)
     
     print(f"gTTS voice generated: {out_path}")
     return out_path
 
 
+# Terminal punctuation plus any closing quotes/brackets (kept with the
+# sentence), then the whitespace the split happens at
+_SENTENCE_END = re.compile(r"[.!?\u2026]+[\"'\u201d\u2019)\]]*(?=\s)")
+# Words whose trailing period does not end a sentence
+_ABBREVIATIONS = frozenset([
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc",
+    "no", "vol", "fig", "approx", "dept", "inc", "ltd", "co", "jan", "feb",
+    "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+])
+_CLAUSE_END = re.compile(r"(?<=[,;:\u2014])\s+")
+
+
+def split_text(text: str, max_chars: int):
+    """
+    Split normalized text into chunks of at most max_chars.
+    
+    Chunks never cross a paragraph break and are one sentence each, so an
+    edit to one sentence leaves every other chunk (and its cache entry)
+    unchanged. Closing quotes and brackets stay with their sentence, and
+    periods after abbreviations and initials ("Dr.", "e.g.", "J.") do not
+    end one. Sentences over max_chars are split at clause and then word
+    boundaries.
+    """
+    chunks = []
+    for paragraph in text.split("\n\n"):
+        for sentence in _split_sentences(paragraph.strip()):
+            chunks.extend(_split_long(sentence, max_chars))
+    return chunks
+
+
+def _is_abbreviation(text: str, end: int):
+    """Whether the period ending text[:end] belongs to an abbreviation or initial"""
+    word = text[:end].rsplit(None, 1)[-1].lstrip("\"'\u201c\u2018([")
+    stem = word.rstrip(".")
+    if "." in stem:
+        return True                    # e.g., i.e., U.S.
+    if stem.lower() in _ABBREVIATIONS:
+        return True
+    # Initials and short capitalised titles ("J.", "Mt.")
+    return len(stem) <= 2 and stem[:1].isupper() and (len(stem) == 1 or stem[1:].islower())
+
+
+def _split_sentences(paragraph: str):
+    sentences, start = [], 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        punct_end = match.start() + len(match.group().rstrip("\"'\u201d\u2019)]"))
+        if paragraph[punct_end - 1] == "." and _is_abbreviation(paragraph, punct_end):
+            continue
+        # '"Why?" she asked' is one sentence
+        if paragraph[match.end():].lstrip()[:1].islower():
+            continue
+        sentences.append(paragraph[start:match.end()].strip())
+        start = match.end()
+    sentences.append(paragraph[start:].strip())
+    return [s for s in sentences if s]
+
+
+def _split_long(sentence: str, max_chars: int):
+    if len(sentence) <= max_chars:
+        return [sentence]
+    
+    parts, current = [], ""
+    pieces = _CLAUSE_END.split(sentence)
+    if len(pieces) == 1:
+        pieces = sentence.split(" ")
+    for piece in pieces:
+        if len(piece) > max_chars:
+            # No usable boundary: flush and split the piece itself further
+            if current:
+                parts.append(current)
+                current = ""
+            parts.extend(_split_long(piece, max_chars) if " " in piece else
+                         [piece[i:i + max_chars] for i in range(0, len(piece), max_chars)])
+            continue
+        candidate = f"{current} {piece}".strip()
+        if len(candidate) > max_chars:
+            parts.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _decode_pcm(path: str, sample_rate: int):
+    """Decode any audio file to mono float32 PCM at sample_rate"""
+    if shutil.which("ffmpeg"):
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+            capture_output=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"Could not decode {path}: {result.stderr.decode(errors='replace')}")
+        return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    # Without ffmpeg only 16-bit PCM WAV can be read
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise Exception(f"Cannot decode {path} without ffmpeg")
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+        pcm = pcm.reshape(-1, w.getnchannels()).mean(axis=1)
+        src_rate = w.getframerate()
+    if src_rate != sample_rate:
+        positions = np.arange(int(len(pcm) * sample_rate / src_rate)) * (src_rate / sample_rate)
+        pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.float32)
+    return pcm
+
+
+def _crossfade_concat(segments, sample_rate: int, crossfade_ms: float):
+    """Join PCM segments in order, overlapping neighbours with a linear crossfade"""
+    fade = int(sample_rate * crossfade_ms / 1000)
+    total = sum(len(seg) for seg in segments)
+    overlaps = [min(fade, len(a), len(b)) for a, b in zip(segments, segments[1:])]
+    out = np.zeros(total - sum(overlaps), dtype=np.float32)
+    
+    pos = 0
+    for i, seg in enumerate(segments):
+        overlap = overlaps[i - 1] if i > 0 else 0
+        if overlap:
+            ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            out[pos - overlap:pos] *= 1.0 - ramp
+            out[pos - overlap:pos] += seg[:overlap] * ramp
+        out[pos:pos + len(seg) - overlap] = seg[overlap:]
+        pos += len(seg) - overlap
+    return out
+
+
+def _write_wav(path: str, pcm, sample_rate: int):
+    """Write mono float PCM as 16-bit WAV"""
+    data = (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data.tobytes())
+
+
+def synthesize_voice_chunked(text: str, voice_id: str = None, max_chars: int = None,
+                             workers: int = None, crossfade_ms: float = TTS_CROSSFADE_MS,
+                             cancel_event=None):
+    """
+    Synthesize a long script as sentence chunks in parallel, then stitch.
+    
+    Each chunk goes through synthesize_voice(), so chunks are cached
+    individually and editing one sentence only re-synthesizes that sentence.
+    Chunks are decoded to PCM, joined in order with short crossfades and
+    written as one WAV (also cached).
+    
+    Args:
+        text: Script to speak
+        voice_id: ElevenLabs voice ID (optional)
+        max_chars: Chunk size limit (default: first available provider's limit)
+        workers: Concurrent provider requests (default TTS_CHUNK_WORKERS)
+        crossfade_ms: Overlap between neighbouring chunks
+        cancel_event: Optional threading.Event; chunks not yet started are
+                      skipped once set and the call raises
+        
+    Returns:
+        Path to the stitched WAV file
+    """
+    
+    text = normalize_text(text)
+    provider = _tts_providers(text, voice_id, "wav")[0][0]
+    chunks = split_text(text, max_chars or TTS_CHUNK_CHARS[provider])
+    
+    if len(chunks) <= 1:
+        return synthesize_voice(text, voice_id)
+    
+    def _synthesize_chunk(chunk):
+        if cancel_event is not None and cancel_event.is_set():
+            raise Exception("Voice synthesis cancelled")
+        return synthesize_voice(chunk, voice_id)
+    
+    print(f"Synthesizing {len(chunks)} chunks ({provider})")
+    with ThreadPoolExecutor(max_workers=workers or TTS_CHUNK_WORKERS, thread_name_prefix="tts-chunk") as pool:
+        paths = list(pool.map(_synthesize_chunk, chunks))
+    
+    # Chunk files are content-addressed, so their names identify the result
+    sample_rate = TTS_STITCH_SAMPLE_RATE
+    key = make_key("tts-stitched", [os.path.basename(p) for p in paths], crossfade_ms, sample_rate)
+    cached = TTS_CACHE.get(key, ".wav")
+    if cached:
+        return cached
+    
+    segments = [_decode_pcm(p, sample_rate) for p in paths]
+    audio = _crossfade_concat(segments, sample_rate, crossfade_ms)
+    path = TTS_CACHE.put(key, lambda tmp: _write_wav(tmp, audio, sample_rate), ".wav")
+    print(f"Stitched {len(chunks)} chunks: {path}")
+    return path
+
+
+def synthesize_script(text: str, voice_id: str = None, chunked: bool = None, cancel_event=None):
+    """
+    Synthesize a script, in chunks when it is long.
+    
+    chunked=None picks chunked mode for scripts over TTS_CHUNKED_MIN_CHARS.
+    cancel_event is checked before synthesis starts and, when chunked,
+    between chunks; a single provider call is not interrupted.
+    """
+    if chunked is None:
+        chunked = len(text) > TTS_CHUNKED_MIN_CHARS
+    if chunked:
+        return synthesize_voice_chunked(text, voice_id, cancel_event=cancel_event)
+    if cancel_event is not None and cancel_event.is_set():
+        raise Exception("Voice synthesis cancelled")
+    return synthesize_voice(text, voice_id)
+
+
 def run_voice(payload):
     """
     Legacy interface for worker.py compatibility.
@@ -146,7 +527,8 @@ def run_voice(payload):
         "text": "hello world",
         "voice_id": "custom_voice_id",
         "speed": 1.0,
-        "emotion": "neutral"
+        "emotion": "neutral",
+        "chunked": null  # true/false, default: by script length
     }
     """
     
@@ -156,7 +538,7 @@ def run_voice(payload):
     if not text:
         raise Exception("No text provided for voice synthesis")
     
-    return synthesize_voice(text, voice_id)
+    return synthesize_script(text, voice_id, payload.get("chunked"))
 
 
 def list_elevenlabs_voices():
@@ -168,7 +550,7 @@ def list_elevenlabs_voices():
     url = "https://api.elevenlabs.io/v1/voices"
     headers = {"xi-api-key": ELEVENLABS_API_KEY}
     
-    response = requests.get(url, headers=headers)
+    response = get_client().get(url, headers=headers)
     
     if response.status_code != 200:
         return {"error": f"API error: {response.status_code}"}
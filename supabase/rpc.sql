@@ -15,3 +15,34 @@ begin
   return new_id;
 end;
 $$;
+
+
+-- Atomically claim up to p_limit queued jobs for a worker.
+-- FOR UPDATE SKIP LOCKED lets concurrent workers claim disjoint rows
+-- without blocking on each other, so no job is handed out twice.
+create or replace function claim_render_jobs(
+  p_limit int default 1,
+  p_types text[] default null
+)
+returns setof render_jobs
+language plpgsql
+as $$
+begin
+  return query
+  with claimable as (
+    select id
+    from render_jobs
+    where status = 'queued'
+      and (p_types is null or type = any(p_types))
+    order by created_at asc
+    limit greatest(p_limit, 1)
+    for update skip locked
+  )
+  update render_jobs r
+  set status = 'processing',
+      updated_at = now()
+  from claimable
+  where r.id = claimable.id
+  returning r.*;
+end;
+$$;
@@ -5,7 +5,10 @@ create table render_jobs (
   payload jsonb,
   status text default 'queued',
   result_url text,
+  result jsonb,
   error text,
+  progress int default 0,
+  metrics jsonb,
   created_at timestamp default now(),
   updated_at timestamp default now()
 );
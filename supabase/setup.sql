@@ -12,11 +12,20 @@ CREATE TABLE IF NOT EXISTS render_jobs (
   payload jsonb NOT NULL,
   status text DEFAULT 'queued' CHECK (status IN ('queued', 'processing', 'completed', 'error')),
   result_url text,
+  result jsonb,
   error text,
+  progress int DEFAULT 0,
+  metrics jsonb,
   created_at timestamp DEFAULT now(),
   updated_at timestamp DEFAULT now()
 );
 
+-- Columns added after the first release
+ALTER TABLE render_jobs ADD COLUMN IF NOT EXISTS result jsonb;
+ALTER TABLE render_jobs ADD COLUMN IF NOT EXISTS progress int DEFAULT 0;
+-- Per-stage timings/resources written by the worker (see workers/runpod/instrumentation.py)
+ALTER TABLE render_jobs ADD COLUMN IF NOT EXISTS metrics jsonb;
+
 -- Create index for faster queries
 CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON render_jobs(status);
 CREATE INDEX IF NOT EXISTS idx_render_jobs_user_id ON render_jobs(user_id);
@@ -41,6 +50,35 @@ BEGIN
 END;
 $$;
 
+-- Create function to atomically claim queued jobs (used by GPU workers)
+CREATE OR REPLACE FUNCTION claim_render_jobs(
+  p_limit int DEFAULT 1,
+  p_types text[] DEFAULT NULL
+)
+RETURNS SETOF render_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH claimable AS (
+    SELECT id
+    FROM render_jobs
+    WHERE status = 'queued'
+      AND (p_types IS NULL OR type = ANY(p_types))
+    ORDER BY created_at ASC
+    LIMIT GREATEST(p_limit, 1)
+    FOR UPDATE SKIP LOCKED
+  )
+  UPDATE render_jobs r
+  SET
+    status = 'processing',
+    updated_at = now()
+  FROM claimable
+  WHERE r.id = claimable.id
+  RETURNING r.*;
+END;
+$$;
+
 -- Create function to update job status
 CREATE OR REPLACE FUNCTION update_job_status(
   p_job_id uuid,
@@ -101,6 +139,7 @@ GRANT ALL ON render_jobs TO service_role;
 GRANT SELECT ON render_jobs TO authenticated;
 GRANT EXECUTE ON FUNCTION add_render_job TO service_role, authenticated;
 GRANT EXECUTE ON FUNCTION update_job_status TO service_role;
+GRANT EXECUTE ON FUNCTION claim_render_jobs TO service_role;
 GRANT EXECUTE ON FUNCTION get_user_jobs TO authenticated;
 
 -- Verification query
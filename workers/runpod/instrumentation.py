@@ -0,0 +1,337 @@
+# ======================================
+# YOcreator — Job Instrumentation
+# workers/runpod/instrumentation.py
+# ======================================
+# Per-job spans (fetch, voice, avatar, lipsync, encode, upload), each with
+# wall time, CPU time, bytes read/written, frames/sec and the process peak
+# RSS as of the span's end:
+#   - stored on the job row (render_jobs.metrics)
+#   - drive throttled progress updates while the job runs
+#   - aggregated per job type / span and served in Prometheus text format
+#
+# CPU time, RSS and I/O are process-wide counters (plus waited-for children
+# such as ffmpeg), so spans of jobs running side by side overlap. Peak RSS
+# is the process high-water mark, which never goes down: it is an upper
+# bound for a span, not the span's own usage.
+
+import os
+import time
+import resource
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimum seconds between progress updates for one job
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "2"))
+
+# Share of job progress per span, by job type. Spans not listed report
+# metrics but do not move progress; the remainder is the result upload.
+PROGRESS_WEIGHTS = {
+    "voice": {"voice": 95},
+    "avatar": {"avatar": 95},
+    # lipsync frames are generated while the encoder consumes them, so the
+    # frame count of the lipsync span tracks both
+    "full_avatar": {"voice": 15, "avatar": 15, "lipsync": 65},
+    "final": {"encode": 95},
+}
+
+
+# ------------------------------------------------------------------
+# Resource snapshots
+# ------------------------------------------------------------------
+
+def _io_bytes():
+    """(read_bytes, write_bytes) hitting storage for this process, or None"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _cpu_seconds():
+    """CPU time of this process plus its waited-for children"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _peak_rss_bytes():
+    """High-water RSS of this process or its largest child (Linux reports KiB)"""
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, child_rss) * 1024
+
+
+class Span:
+    """One measured stage of a job"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = None
+        self.fraction = 0.0
+        self.done = False
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.read_bytes = None
+        self.write_bytes = None
+        self.process_peak_rss_bytes = None
+
+    def start(self):
+        self._wall = time.perf_counter()
+        self._cpu = _cpu_seconds()
+        self._io = _io_bytes()
+
+    def stop(self):
+        self.wall_seconds += time.perf_counter() - self._wall
+        self.cpu_seconds += _cpu_seconds() - self._cpu
+        io = _io_bytes()
+        if io and self._io:
+            self.read_bytes = (self.read_bytes or 0) + io[0] - self._io[0]
+            self.write_bytes = (self.write_bytes or 0) + io[1] - self._io[1]
+        self.process_peak_rss_bytes = _peak_rss_bytes()
+
+    def to_dict(self):
+        fps = None
+        if self.frames and self.wall_seconds > 0:
+            fps = round(self.frames / self.wall_seconds, 2)
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "process_peak_rss_bytes": self.process_peak_rss_bytes,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+            "frames": self.frames,
+            "fps": fps,
+        }
+
+
+@contextmanager
+def measure(name):
+    """Measure a block outside any job (e.g. the claim round trip); yields the Span"""
+    span = Span(name)
+    span.start()
+    try:
+        yield span
+    finally:
+        span.stop()
+        span.done = True
+
+
+# ------------------------------------------------------------------
+# Per-job collection
+# ------------------------------------------------------------------
+
+class JobMetrics:
+    """
+    Spans of one job, plus progress derived from them.
+
+    on_progress(percent) is called at most every PROGRESS_INTERVAL seconds
+    and only when the integer percentage has gone up.
+    """
+
+    def __init__(self, job_type, on_progress=None):
+        self.job_type = job_type
+        self.on_progress = on_progress
+        self.weights = PROGRESS_WEIGHTS.get(job_type, {})
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._reported = 0
+        self._reported_at = 0.0
+
+    @contextmanager
+    def span(self, name):
+        """Measure a block as span `name`; yields the Span (set .frames on it)"""
+        span = self._open(name)
+        span.start()
+        try:
+            yield span
+        finally:
+            span.stop()
+        # A failed span keeps its measurements but does not count as progress
+        span.done = True
+        self._progress()
+
+    def iter_span(self, name, frames, total=None):
+        """
+        Pass frames through, measuring only the time spent producing them.
+
+        Used for lazily generated frames (lipsync) consumed by another
+        span (encode); progress follows frames produced / total.
+        """
+        span = self._open(name)
+        span.frames = 0
+        iterator = iter(frames)
+        while True:
+            span.start()
+            try:
+                frame = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                span.stop()
+            span.frames += 1
+            if total:
+                span.fraction = min(span.frames / total, 1.0)
+                self._progress()
+            yield frame
+        span.done = True
+        self._progress()
+
+    def _open(self, name):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = Span(name)
+            return span
+
+    def progress(self):
+        """0-99 from finished spans and the fraction of running ones"""
+        with self._lock:
+            done = sum(
+                weight * (1.0 if span.done else span.fraction)
+                for name, weight in self.weights.items()
+                for span in [self.spans.get(name)] if span is not None
+            )
+        return min(int(done), 99)
+
+    def _progress(self):
+        if self.on_progress is None:
+            return
+        percent = self.progress()
+        now = time.monotonic()
+        with self._lock:
+            if percent <= self._reported or now - self._reported_at < PROGRESS_INTERVAL:
+                return
+            self._reported, self._reported_at = percent, now
+        self.on_progress(percent)
+
+    def to_dict(self):
+        with self._lock:
+            return {name: span.to_dict() for name, span in self.spans.items()}
+
+
+_current = contextvars.ContextVar("job_metrics", default=None)
+
+
+def current_metrics():
+    """JobMetrics of the job running in this thread (a detached one outside jobs)"""
+    metrics = _current.get()
+    return metrics if metrics is not None else JobMetrics(None)
+
+
+def run_job(runner, job_type, payload, on_progress=None):
+    """
+    Run runner(payload) with a JobMetrics installed for current_metrics().
+
+    Returns (result, spans dict). On failure the spans are attached to the
+    exception as `job_metrics`, which survives the trip back from a
+    process pool.
+    """
+    metrics = JobMetrics(job_type, on_progress)
+    token = _current.set(metrics)
+    try:
+        result = runner(payload)
+    except Exception as e:
+        e.job_metrics = metrics.to_dict()
+        raise
+    finally:
+        _current.reset(token)
+    return result, metrics.to_dict()
+
+
+# ------------------------------------------------------------------
+# Prometheus export
+# ------------------------------------------------------------------
+
+PREFIX = "yocreator_worker"
+
+_SPAN_COUNTERS = (
+    ("span_wall_seconds_total", "wall_seconds", "Wall time spent in job spans"),
+    ("span_cpu_seconds_total", "cpu_seconds", "Process CPU time during job spans"),
+    ("span_read_bytes_total", "read_bytes", "Bytes read from storage during job spans"),
+    ("span_write_bytes_total", "write_bytes", "Bytes written to storage during job spans"),
+    ("span_frames_total", "frames", "Frames processed in job spans"),
+)
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in labels.items())
+    return f"{{{inner}}}"
+
+
+class MetricsExporter:
+    """Aggregates finished jobs' spans and renders Prometheus text exposition"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = {}       # (job_type, status) -> count
+        self.spans = {}      # (job_type, span) -> totals
+        self.gauges = {}     # callables returning {name: (help, {labels tuple: value})}
+
+    def record_job(self, job_type, status, spans):
+        with self._lock:
+            key = (job_type, status)
+            self.jobs[key] = self.jobs.get(key, 0) + 1
+            for name, values in (spans or {}).items():
+                totals = self.spans.setdefault((job_type, name), {"count": 0})
+                totals["count"] += 1
+                for _, field, _ in _SPAN_COUNTERS:
+                    totals[field] = totals.get(field, 0) + (values.get(field) or 0)
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{_labels(**labels)} {value}")
+
+        with self._lock:
+            jobs = sorted(self.jobs.items())
+            spans = sorted(self.spans.items())
+
+        family("jobs_total", "counter", "Jobs finished, by type and status",
+               [({"job_type": t, "status": s}, n) for (t, s), n in jobs])
+        family("spans_total", "counter", "Job spans finished",
+               [({"job_type": t, "span": s}, v["count"]) for (t, s), v in spans])
+        for name, field, help_text in _SPAN_COUNTERS:
+            family(name, "counter", help_text,
+                   [({"job_type": t, "span": s}, round(v.get(field, 0), 3)) for (t, s), v in spans])
+        family("process_peak_rss_bytes", "gauge", "High-water RSS of the worker process or its largest child",
+               [({}, _peak_rss_bytes())])
+
+        for collect in list(self.gauges.values()):
+            for name, (help_text, samples) in collect().items():
+                family(name, "gauge", help_text, samples)
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serve /metrics on a daemon thread; returns the server"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+exporter = MetricsExporter()
@@ -0,0 +1,155 @@
+# ======================================
+# YOcreator — Local Supabase REST Stand-in
+# workers/runpod/rest_standin.py
+# ======================================
+# In-memory imitation of the render_jobs endpoints the worker uses, so the
+# claim path can be exercised locally with several workers at once:
+#
+#   python workers/runpod/rest_standin.py --port 54321 --seed 20
+#   SUPABASE_URL=http://127.0.0.1:54321 SERVICE_KEY=local python workers/runpod/worker.py
+#
+# Supported:
+#   GET   /rest/v1/render_jobs?status=eq.queued&type=in.(a,b)&limit=N
+#   POST  /rest/v1/render_jobs                      (enqueue)
+#   PATCH /rest/v1/render_jobs?id=eq.X[&status=eq.queued]
+#   POST  /rest/v1/rpc/claim_render_jobs            {"p_limit", "p_types"}
+#   GET   /standin/claims                           (claim counts per job id)
+
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+_lock = threading.Lock()
+_jobs = []
+_claims = {}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def add_job(job_type, payload=None):
+    """Insert a queued job and return its row"""
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": None,
+        "type": job_type,
+        "payload": payload or {},
+        "status": "queued",
+        "result_url": None,
+        "error": None,
+        "created_at": _now(),
+        "updated_at": _now(),
+    }
+    with _lock:
+        _jobs.append(job)
+    return job
+
+
+def _matches(job, filters):
+    for column, expr in filters.items():
+        op, _, value = expr.partition(".")
+        if op == "eq" and str(job.get(column)) != value:
+            return False
+        if op == "in" and str(job.get(column)) not in value.strip("()").split(","):
+            return False
+    return True
+
+
+def _split_query(path):
+    parsed = urlparse(path)
+    params = dict(parse_qsl(parsed.query))
+    control = {k: params.pop(k) for k in ("select", "order", "limit") if k in params}
+    return parsed.path, params, control
+
+
+def claim(limit, types=None):
+    """Same semantics as the claim_render_jobs RPC"""
+    with _lock:
+        queued = [j for j in _jobs if j["status"] == "queued" and (not types or j["type"] in types)]
+        queued.sort(key=lambda j: j["created_at"])
+        claimed = queued[:max(int(limit), 1)]
+        for job in claimed:
+            job["status"] = "processing"
+            job["updated_at"] = _now()
+            _claims[job["id"]] = _claims.get(job["id"], 0) + 1
+        return [dict(j) for j in claimed]
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, filters, control = _split_query(self.path)
+        if path == "/standin/claims":
+            with _lock:
+                return self._send(200, dict(_claims))
+        if path != "/rest/v1/render_jobs":
+            return self._send(404, {"message": "not found"})
+
+        with _lock:
+            rows = [dict(j) for j in _jobs if _matches(j, filters)]
+        rows.sort(key=lambda j: j["created_at"], reverse=control.get("order", "").endswith(".desc"))
+        if "limit" in control:
+            rows = rows[:int(control["limit"])]
+        self._send(200, rows)
+
+    def do_POST(self):
+        path, _, _ = _split_query(self.path)
+        body = self._body() or {}
+        if path == "/rest/v1/rpc/claim_render_jobs":
+            return self._send(200, claim(body.get("p_limit", 1), body.get("p_types")))
+        if path == "/rest/v1/render_jobs":
+            return self._send(201, [add_job(body.get("type", "voice"), body.get("payload"))])
+        self._send(404, {"message": "not found"})
+
+    def do_PATCH(self):
+        path, filters, _ = _split_query(self.path)
+        if path != "/rest/v1/render_jobs":
+            return self._send(404, {"message": "not found"})
+
+        update = self._body() or {}
+        with _lock:
+            rows = [j for j in _jobs if _matches(j, filters)]
+            for job in rows:
+                job.update(update)
+                job["updated_at"] = _now()
+            rows = [dict(j) for j in rows]
+        self._send(200, rows)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(port=54321):
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"REST stand-in listening on http://127.0.0.1:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local render_jobs REST stand-in")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--seed", type=int, default=0, help="number of queued jobs to create")
+    parser.add_argument("--type", default="video", help="job type for seeded jobs")
+    args = parser.parse_args()
+
+    for i in range(args.seed):
+        add_job(args.type, {"script": f"seed job {i}"})
+    serve(args.port)
@@ -0,0 +1,142 @@
+# ======================================
+# YOcreator — Worker Job Scheduler
+# workers/runpod/scheduler.py
+# ======================================
+# Runs several jobs at once inside one worker, with a separate executor
+# pool and concurrency limit per job type:
+#   voice        -> threads   (network bound, waits on TTS providers)
+#   avatar       -> processes (CPU bound face detection)
+#   full_avatar  -> 1 thread  (GPU bound lipsync, one at a time)
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# job_type -> (executor kind, default max concurrent jobs)
+DEFAULT_POOLS = {
+    "voice": ("thread", 4),
+    "avatar": ("process", 2),
+    "full_avatar": ("thread", 1),
+    "video": ("thread", 2),
+    "final": ("thread", 1),
+}
+
+
+def thread_pools(pools=None):
+    """DEFAULT_POOLS with every pool on threads, so all jobs share one process's models"""
+    return {t: ("thread", n) for t, (_, n) in (pools or DEFAULT_POOLS).items()}
+
+
+def pool_size(job_type, default):
+    """Concurrency for a job type, overridable via WORKER_<TYPE>_CONCURRENCY"""
+    value = os.getenv(f"WORKER_{job_type.upper()}_CONCURRENCY")
+    return max(1, int(value)) if value else default
+
+
+class ExecutorPool:
+    """One executor plus the bookkeeping needed to report its utilization"""
+
+    def __init__(self, name, kind, max_workers, initializer=None):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+
+        if kind == "process":
+            # spawn, not fork: forked children cannot reuse the parent's CUDA
+            # context, so each child warms its own models via `initializer`
+            self.executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"job-{name}")
+
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.created_at = time.monotonic()
+
+    def free_slots(self):
+        with self._lock:
+            return max(self.max_workers - self.pending, 0)
+
+    def submit(self, fn, *args, on_done=None):
+        """Submit fn(*args); on_done(future) runs in the parent when it finishes"""
+        with self._lock:
+            self.pending += 1
+        started = time.monotonic()
+        future = self.executor.submit(fn, *args)
+
+        def _finished(f):
+            with self._lock:
+                self.pending -= 1
+                self.busy_seconds += time.monotonic() - started
+                if f.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            if on_done:
+                on_done(f)
+
+        future.add_done_callback(_finished)
+        return future
+
+    def utilization(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.created_at, 1e-9)
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "active": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "utilization": round(self.busy_seconds / (elapsed * self.max_workers), 4),
+            }
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class JobScheduler:
+    """
+    Routes claimed jobs to the executor pool for their type.
+
+    All pools share a single claim loop: the scheduler only reports job
+    types that still have free slots, and the caller claims at most that
+    many jobs, so nothing sits claimed-but-unstarted behind a full pool.
+    """
+
+    def __init__(self, runners, pools=None, process_initializer=None):
+        self.runners = runners
+        self.pools = {}
+        for job_type, (kind, default) in (pools or DEFAULT_POOLS).items():
+            if job_type in runners:
+                self.pools[job_type] = ExecutorPool(
+                    job_type, kind, pool_size(job_type, default),
+                    initializer=process_initializer,
+                )
+
+    def free_slots(self):
+        """Free slots per job type, omitting types whose pool is full"""
+        slots = {t: p.free_slots() for t, p in self.pools.items()}
+        return {t: n for t, n in slots.items() if n > 0}
+
+    def submit(self, job_type, *args, on_done=None):
+        """Run the job type's runner(*args) on its pool"""
+        pool = self.pools.get(job_type)
+        if pool is None:
+            raise ValueError(f"Unknown job type: {job_type}")
+        return pool.submit(self.runners[job_type], *args, on_done=on_done)
+
+    def utilization(self):
+        return {t: p.utilization() for t, p in self.pools.items()}
+
+    def shutdown(self, wait=True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
@@ -0,0 +1,53 @@
+# ======================================
+# YOcreator — Concurrent Job Stages
+# workers/runpod/stages.py
+# ======================================
+# Runs independent stages of one job side by side (e.g. voice synthesis
+# and avatar creation in a full_avatar job) and joins them before the
+# stages that depend on both.
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_parallel_stages(stages):
+    """
+    Run stages concurrently and wait for all of them.
+
+    Args:
+        stages: {name: fn(cancel_event)}. Each stage should check
+                cancel_event between units of work and stop early once set.
+
+    Returns:
+        (results, timings): {name: return value}, {name: wall seconds}
+
+    The first stage to fail sets cancel_event so its siblings can stop, and
+    its exception is re-raised once every stage has returned. Errors raised
+    by siblings after cancellation are consequences and are not reported.
+    """
+    cancel_event = threading.Event()
+    timings = {}
+    first_error = []
+    lock = threading.Lock()
+
+    def _run(name, fn):
+        started = time.perf_counter()
+        try:
+            return fn(cancel_event)
+        except BaseException as e:
+            with lock:
+                if not first_error:
+                    first_error.append(e)
+                    cancel_event.set()
+            raise
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as pool:
+        futures = {name: pool.submit(_run, name, fn) for name, fn in stages.items()}
+    # Leaving the with-block joined every stage
+
+    if first_error:
+        raise first_error[0]
+    return {name: f.result() for name, f in futures.items()}, timings
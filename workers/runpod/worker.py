@@ -7,50 +7,197 @@
 import os
 import sys
 import time
+
+# Startup import cost is reported against WORKER_IMPORT_TARGET
+_IMPORT_STARTED = time.perf_counter()
+
 import json
-import requests
+import threading
+from functools import partial
 
 # Add project paths
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../server/python"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Import pipeline modules
+# Pipeline modules are imported on first use by the job types that need
+# them, so a voice job never pays for torch/cv2/insightface
 try:
-    from server.python.avatar.create_avatar import create_avatar
-    from server.python.avatar.lipsync import lipsync_avatar, frames_to_video
-    from server.python.voice.inference import synthesize_voice, run_voice
-    from pipeline.render_final import render_final, render_from_frames
+    from pipeline.lazy_imports import LazyModule, timed_import, prewarm, import_report, import_summary
+    with timed_import("pipeline.render_profiles"):
+        from pipeline.render_profiles import get_profile
 except ImportError as e:
     print(f"Import warning: {e}")
     # Fallback imports for container environment
-    from avatar.create_avatar import create_avatar
-    from avatar.lipsync import lipsync_avatar, frames_to_video
-    from voice.inference import synthesize_voice, run_voice
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../pipeline"))
+    from lazy_imports import LazyModule, timed_import, prewarm, import_report, import_summary
+    with timed_import("render_profiles"):
+        from render_profiles import get_profile
+
+with timed_import("requests"):
+    import requests
+
+with timed_import("worker.runtime"):
+    from scheduler import JobScheduler
+    from stages import run_parallel_stages
+    from instrumentation import run_job, current_metrics, measure, exporter
+    from common.model_registry import registry
+
+_avatar = LazyModule("server.python.avatar.create_avatar", "avatar.create_avatar")
+_lipsync = LazyModule("server.python.avatar.lipsync", "avatar.lipsync")
+_voice = LazyModule("server.python.voice.inference", "voice.inference")
+_render = LazyModule("pipeline.render_final", "render_final")
+
+# Job type -> pipeline modules it imports
+JOB_MODULES = {
+    "voice": [_voice],
+    "avatar": [_avatar],
+    "full_avatar": [_voice, _avatar, _lipsync, _render],
+    "video": [],
+    "final": [_render],
+}
+
+# Registry model -> module that registers its loader
+MODEL_MODULES = {
+    "insightface": _avatar,
+    "wav2lip": _lipsync,
+}
+
+STARTUP_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 # Environment
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE") or os.getenv("SERVICE_KEY")
 RUNPOD_MODE = os.getenv("RUNPOD_POD_ID") is not None
 
+# Comma-separated models to load at worker start ("all" for every registered
+# model). Unlisted models still load lazily on first use.
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "")
+
+
+# Number of jobs claimed per queue round trip. Claimed jobs are already
+# marked 'processing', so keep this close to what the worker can run soon.
+CLAIM_BATCH_SIZE = max(1, int(os.getenv("CLAIM_BATCH_SIZE", "2")))
+
+# Prometheus /metrics port in polling mode (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Job types whose modules are imported in the background once the first job
+# is done ("all", "none" or a comma-separated list)
+WORKER_PREWARM = os.getenv("WORKER_PREWARM", "all")
+
+# Worker module import budget in seconds; startup warns when it is exceeded
+WORKER_IMPORT_TARGET = float(os.getenv("WORKER_IMPORT_TARGET", "1.0"))
+
+
+def _headers(extra=None):
+    """Service-role headers for Supabase REST calls"""
+    headers = {
+        "apikey": SERVICE_KEY,
+        "Authorization": f"Bearer {SERVICE_KEY}",
+        "Content-Type": "application/json",
+    }
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def claim_jobs(limit=CLAIM_BATCH_SIZE, job_types=None):
+    """
+    Atomically claim up to `limit` queued jobs.
+
+    Uses the claim_render_jobs RPC (FOR UPDATE SKIP LOCKED), so concurrent
+    workers never receive the same job. Claimed rows come back already in
+    'processing'. Falls back to a conditional PATCH per job when the RPC
+    has not been deployed yet.
+    """
+    body = {"p_limit": limit}
+    if job_types:
+        body["p_types"] = list(job_types)
 
-def fetch_job():
-    """Fetch next queued job from Supabase"""
     try:
-        r = requests.get(
-            f"{SUPABASE_URL}/rest/v1/render_jobs?status=eq.queued&order=created_at.asc&limit=1&select=*",
-            headers={"apikey": SERVICE_KEY},
+        r = requests.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/claim_render_jobs",
+            headers=_headers(),
+            data=json.dumps(body),
             timeout=10
         )
+        if r.status_code == 404:
+            return _claim_jobs_legacy(limit, job_types)
+        r.raise_for_status()
         jobs = r.json()
-        return jobs[0] if isinstance(jobs, list) and jobs else None
     except Exception as e:
-        print(f"Error fetching job: {e}")
-        return None
+        print(f"Error claiming jobs: {e}")
+        return []
+
+    if not isinstance(jobs, list):
+        return []
+    return sorted(jobs, key=lambda j: j.get("created_at") or "")
+
 
+def _claim_jobs_legacy(limit, job_types=None):
+    """Claim via GET + PATCH guarded on status=queued (one row at a time)"""
+    query = f"status=eq.queued&order=created_at.asc&limit={limit}&select=*"
+    if job_types:
+        query += f"&type=in.({','.join(job_types)})"
 
-def update_job(job_id, status, result=None, error=None, progress=None):
-    """Update job status in Supabase"""
+    r = requests.get(
+        f"{SUPABASE_URL}/rest/v1/render_jobs?{query}",
+        headers=_headers(),
+        timeout=10
+    )
+    candidates = r.json()
+    if not isinstance(candidates, list):
+        return []
+
+    claimed = []
+    for job in candidates:
+        # The status filter makes the PATCH a no-op if another worker won
+        r = requests.patch(
+            f"{SUPABASE_URL}/rest/v1/render_jobs?id=eq.{job['id']}&status=eq.queued",
+            headers=_headers({"Prefer": "return=representation"}),
+            data=json.dumps({"status": "processing"}),
+            timeout=10
+        )
+        rows = r.json() if r.ok else []
+        if isinstance(rows, list) and rows:
+            claimed.append(rows[0])
+    return claimed
+
+
+def fail_unknown_jobs(known_types):
+    """
+    Mark queued jobs whose type is not in known_types as errors; returns the failed rows.
+
+    The claim loop only asks for types with a free pool, so without this a
+    job with a bad type would sit in 'queued' forever.
+    """
+    types = ",".join(sorted(known_types))
+    try:
+        r = requests.patch(
+            f"{SUPABASE_URL}/rest/v1/render_jobs?status=eq.queued&or=(type.is.null,type.not.in.({types}))",
+            headers=_headers({"Prefer": "return=representation"}),
+            data=json.dumps({"status": "error", "error": "Unknown job type"}),
+            timeout=10
+        )
+        rows = r.json() if r.ok else []
+    except Exception as e:
+        print(f"Error failing unknown jobs: {e}")
+        return []
+    if not isinstance(rows, list):
+        return []
+    for job in rows:
+        exporter.record_job(job.get("type") or "", "error", {})
+        print(f"Job {job.get('id')} failed: Unknown job type: {job.get('type')}")
+    return rows
+
+
+def update_job(job_id, status, result=None, error=None, progress=None, metrics=None):
+    """Update job status in Supabase; result is an output path or a dict with an output path"""
     payload = {"status": status}
+    if isinstance(result, dict):
+        payload["result"] = result
+        result = result.get("output")
     if result:
         payload["result_url"] = result
         payload["output_url"] = result
@@ -58,11 +205,13 @@ def update_job(job_id, status, result=None, error=None, progress=None):
         payload["error"] = error
     if progress is not None:
         payload["progress"] = progress
+    if metrics is not None:
+        payload["metrics"] = metrics
 
     try:
         requests.patch(
             f"{SUPABASE_URL}/rest/v1/render_jobs?id=eq.{job_id}",
-            headers={"apikey": SERVICE_KEY, "Content-Type": "application/json"},
+            headers=_headers(),
             data=json.dumps(payload),
             timeout=10
         )
@@ -70,6 +219,11 @@ def update_job(job_id, status, result=None, error=None, progress=None):
         print(f"Error updating job: {e}")
 
 
+def report_progress(job_id, percent):
+    """Progress callback for a running job (throttled by its JobMetrics)"""
+    update_job(job_id, "processing", progress=percent)
+
+
 def process_voice_job(payload):
     """Process voice synthesis job"""
     text = payload.get("text", "")
@@ -78,19 +232,22 @@ def process_voice_job(payload):
     if not text:
         raise ValueError("No text provided for voice synthesis")
     
-    output_path = synthesize_voice(text, voice_id)
+    with current_metrics().span("voice"):
+        output_path = _voice.synthesize_script(text, voice_id, payload.get("chunked"))
     return output_path
 
 
 def process_avatar_job(payload):
     """Process avatar creation job"""
     image_dir = payload.get("image_dir") or payload.get("images")
-    output_name = payload.get("name", "avatar")
+    # Unnamed avatars stay in their (immutable) cache entry
+    output_name = payload.get("name")
     
     if not image_dir:
         raise ValueError("No image directory provided for avatar creation")
     
-    result = create_avatar(image_dir, output_name)
+    with current_metrics().span("avatar"):
+        result = _avatar.create_avatar(image_dir, output_name)
     
     if not result.get("success"):
         raise Exception(result.get("error", "Avatar creation failed"))
@@ -105,8 +262,12 @@ def process_full_avatar_job(payload):
     payload = {
         "script": "Text to speak",
         "images": "/path/to/face/photos",
-        "voice_id": "optional_elevenlabs_voice_id"
+        "voice_id": "optional_elevenlabs_voice_id",
+        "chunked": null,  # sentence-chunked TTS, default: by script length
+        "profile": "draft" | "standard" | "master"  # default RENDER_PROFILE
     }
+    
+    Returns {"output": video path, "profile": profile name}
     """
     script = payload.get("script", "")
     images = payload.get("images") or payload.get("image_dir")
@@ -116,30 +277,55 @@ def process_full_avatar_job(payload):
         raise ValueError("No script provided")
     if not images:
         raise ValueError("No images provided")
+    profile = get_profile(payload.get("profile"))
+    metrics = current_metrics()
+    
+    # Steps 1+2: voice (network bound) and avatar (CPU/GPU bound) are
+    # independent, so run them side by side and join before lipsync
+    def voice_stage(cancel_event):
+        print("Step 1: Generating voice...")
+        with metrics.span("voice"):
+            return _voice.synthesize_script(script, voice_id, payload.get("chunked"), cancel_event=cancel_event)
     
-    # Step 1: Generate voice
-    print("Step 1: Generating voice...")
-    audio_path = synthesize_voice(script, voice_id)
+    def avatar_stage(cancel_event):
+        print("Step 2: Creating avatar mesh...")
+        with metrics.span("avatar"):
+            avatar_result = _avatar.create_avatar(images, cancel_event=cancel_event)
+        if not avatar_result.get("success"):
+            raise Exception(avatar_result.get("error", "Avatar creation failed"))
+        return avatar_result["output"]
     
-    # Step 2: Create avatar from photos
-    print("Step 2: Creating avatar mesh...")
-    avatar_result = create_avatar(images)
-    if not avatar_result.get("success"):
-        raise Exception(avatar_result.get("error", "Avatar creation failed"))
-    avatar_data = avatar_result["output"]
+    results, timings = run_parallel_stages({"voice": voice_stage, "avatar": avatar_stage})
+    audio_path = results["voice"]
+    avatar_data = results["avatar"]
+    print(f"Stage wall time: {json.dumps(timings)}")
     
-    # Step 3: Lip sync
+    # Step 3: Lip sync (frames are generated lazily, nothing hits disk)
     print("Step 3: Applying lip sync...")
-    lipsync_result = lipsync_avatar(avatar_data, audio_path)
+    lipsync_result = _lipsync.lipsync_stream(avatar_data, audio_path, fps=profile["fps"],
+                                    max_height=profile["max_height"])
     if not lipsync_result.get("success"):
         raise Exception(lipsync_result.get("error", "Lip sync failed"))
-    lipsynced_frames = lipsync_result["output"]
     
-    # Step 4: Render final video
+    # Step 4: Render final video, encoding frames as lipsync produces them.
+    # The lipsync span measures only frame generation inside the encode span.
     print("Step 4: Rendering final video...")
-    final_video = render_from_frames(lipsynced_frames, audio_path)
+    frames = metrics.iter_span("lipsync", lipsync_result["frames"], total=lipsync_result["num_frames"])
+    with metrics.span("encode") as span:
+        stats = {}
+        final_video = _render.render_from_frames(frames, audio_path, fps=lipsync_result["fps"],
+                                         stats=stats, profile=profile["name"])
+        span.frames = stats.get("frames")
     
-    return final_video
+    return {"output": final_video, "profile": profile["name"]}
+
+
+def process_final_job(payload):
+    """Composite + audio mix (render_final); payload is render_final's inputs"""
+    profile = get_profile(payload.get("profile"))
+    with current_metrics().span("encode"):
+        final_video = _render.render_final({**payload, "profile": profile["name"]})
+    return {"output": final_video, "profile": profile["name"]}
 
 
 def process_video_job(payload):
@@ -153,6 +339,81 @@ def process_video_job(payload):
     return f"video_placeholder_{template}"
 
 
+# Job type -> runner(payload). Runners must be module-level functions so the
+# process pool can pickle them.
+JOB_RUNNERS = {
+    "voice": process_voice_job,
+    "avatar": process_avatar_job,
+    "full_avatar": process_full_avatar_job,
+    "video": process_video_job,
+    "final": process_final_job,
+}
+
+def preload_models():
+    """Warm the models named in PRELOAD_MODELS (also runs in each process-pool child)"""
+    names = [n.strip() for n in PRELOAD_MODELS.split(",") if n.strip()]
+    if not names:
+        return
+    # Loaders register when their engine module is imported
+    for name in (list(MODEL_MODULES) if names == ["all"] else names):
+        if name in MODEL_MODULES:
+            try:
+                MODEL_MODULES[name].load()
+            except ImportError as e:
+                print(f"Model preload failed: {name}: {e}")
+    registry.preload(None if names == ["all"] else names)
+
+
+_prewarm_lock = threading.Lock()
+_prewarm_started = False
+
+
+def prewarm_modules(job_types=None):
+    """
+    Import the modules of the WORKER_PREWARM job types on a background thread.
+
+    Runs once, after the first job, so the first job is not slowed down and
+    later job types find their modules loaded. job_types limits it further
+    (e.g. to the types that run in this process).
+    """
+    global _prewarm_started
+    setting = WORKER_PREWARM.strip().lower()
+    if setting in ("", "none", "off", "0"):
+        return None
+    with _prewarm_lock:
+        if _prewarm_started:
+            return None
+        _prewarm_started = True
+
+    types = list(JOB_MODULES) if setting == "all" else [t.strip() for t in setting.split(",")]
+    if job_types is not None:
+        types = [t for t in types if t in job_types]
+    modules = []
+    for job_type in types:
+        for module in JOB_MODULES.get(job_type, []):
+            if not module.loaded and module not in modules:
+                modules.append(module)
+    if not modules:
+        return None
+    print(f"Prewarming: {', '.join(m.name for m in modules)}")
+    return prewarm(modules)
+
+
+def log_import_report():
+    """Print startup import cost against WORKER_IMPORT_TARGET, per timed module"""
+    status = "over" if STARTUP_IMPORT_SECONDS > WORKER_IMPORT_TARGET else "within"
+    print(f"Worker imports: {STARTUP_IMPORT_SECONDS:.3f}s ({status} target {WORKER_IMPORT_TARGET:.2f}s)")
+    for record in import_report():
+        print(f"  {record['module']:<40} {record['seconds']:.3f}s  {' '.join(record['new_packages'])}")
+
+
+# Seconds between pool utilization reports in polling mode
+UTILIZATION_REPORT_INTERVAL = float(os.getenv("UTILIZATION_REPORT_INTERVAL", "60"))
+
+# Seconds between sweeps that fail queued jobs of unknown type (0 disables)
+UNKNOWN_JOB_SWEEP_INTERVAL = float(os.getenv("UNKNOWN_JOB_SWEEP_INTERVAL", "30"))
+
+
 def handler(event):
     """RunPod serverless handler function"""
     job_input = event.get("input", {})
@@ -160,70 +421,167 @@ def handler(event):
     job_type = job_input.get("type", "voice")
     
     try:
-        if job_type == "voice":
-            result = process_voice_job(job_input)
-        elif job_type == "avatar":
-            result = process_avatar_job(job_input)
-        elif job_type == "full_avatar":
-            result = process_full_avatar_job(job_input)
-        elif job_type == "video":
-            result = process_video_job(job_input)
-        else:
+        runner = JOB_RUNNERS.get(job_type)
+        if runner is None:
             raise ValueError(f"Unknown job type: {job_type}")
+        result, metrics = run_job(runner, job_type, job_input)
+        
+        # "output" stays the output path; runners that return a dict
+        # (e.g. full_avatar's profile) add their other keys beside it
+        extra = {}
+        if isinstance(result, dict):
+            extra = {k: v for k, v in result.items() if k != "output"}
+            result = result.get("output")
         
-        return {"status": "success", "output": result}
+        return {"status": "success", "output": result, **extra, "metrics": metrics}
     
     except Exception as e:
         return {"status": "error", "error": str(e)}
+    
+    finally:
+        prewarm_modules()
+
+
+def _on_job_done(job, fetch=None, after=None):
+    """Build the completion callback that reports a job's outcome and metrics; after() runs last"""
+    job_type = job.get("type", "")
+
+    def _report(future):
+        error = future.exception()
+        spans = {"fetch": fetch} if fetch else {}
+        if error is None:
+            out, job_spans = future.result()
+            spans.update(job_spans)
+            # No storage upload yet: "upload" is publishing the result row
+            with measure("upload") as upload:
+                update_job(job["id"], "completed", result=out, progress=100, metrics=spans)
+            spans["upload"] = upload.to_dict()
+            exporter.record_job(job_type, "completed", spans)
+            print(f"Job {job['id']} completed: {out}")
+        else:
+            spans.update(getattr(error, "job_metrics", {}))
+            update_job(job["id"], "error", error=str(error), metrics=spans)
+            exporter.record_job(job_type, "error", spans)
+            print(f"Job {job['id']} failed: {error}")
+        print(f"Job {job['id']} metrics: {json.dumps(spans)}")
+        if after:
+            after()
+    return _report
+
 
+def _pool_gauges(scheduler):
+    """Prometheus gauges for pool utilization and loaded models"""
+    def collect():
+        pools = scheduler.utilization()
+        models = registry.metrics()
+        return {
+            "pool_active_jobs": ("Jobs running per pool",
+                                 [({"job_type": t}, u["active"]) for t, u in pools.items()]),
+            "pool_utilization": ("Busy share of pool capacity since start",
+                                 [({"job_type": t}, u["utilization"]) for t, u in pools.items()]),
+            "model_loaded": ("1 if the model is resident",
+                             [({"model": m}, int(bool(v.get("loaded")))) for m, v in models.items()]),
+        }
+    return collect
 
-def run_polling_worker():
-    """Run as polling worker (for non-serverless deployments)"""
+
+def run_polling_worker(pools=None):
+    """
+    Run as polling worker (for non-serverless deployments).
+
+    pools overrides scheduler.DEFAULT_POOLS, e.g. thread_pools() when the
+    worker runs inside the consolidated media service.
+    """
     print("Starting YOcreator GPU Worker (polling mode)...")
     print(f"Supabase URL: {SUPABASE_URL}")
-    
+    print(f"Claim batch size: {CLAIM_BATCH_SIZE}")
+
+    preload_models()
+    # Every runner goes through run_job so its spans come back with the result
+    runners = {t: partial(run_job, runner, t) for t, runner in JOB_RUNNERS.items()}
+    scheduler = JobScheduler(runners, pools, process_initializer=preload_models)
+    for job_type, pool in scheduler.pools.items():
+        print(f"Pool {job_type}: {pool.kind} x{pool.max_workers}")
+    log_import_report()
+
+    # Process-pool job types import their modules in the children
+    in_process = [t for t, pool in scheduler.pools.items() if pool.kind == "thread"]
+    after_job = partial(prewarm_modules, in_process)
+
+    if METRICS_PORT:
+        exporter.gauges["pools"] = _pool_gauges(scheduler)
+        exporter.serve(METRICS_PORT)
+        print(f"Prometheus metrics on :{METRICS_PORT}/metrics")
+
+    last_report = time.monotonic()
+    last_sweep = 0.0
+
     while True:
-        job = fetch_job()
-        
-        if not job:
+        if time.monotonic() - last_report >= UTILIZATION_REPORT_INTERVAL:
+            print(f"Pool utilization: {json.dumps(scheduler.utilization())}")
+            print(f"Model metrics: {json.dumps(registry.metrics())}")
+            last_report = time.monotonic()
+
+        # Claims are filtered to pooled types, so bad types are failed here.
+        # JOB_RUNNERS, not this worker's pools: another worker may run a
+        # type this one has no pool for.
+        if UNKNOWN_JOB_SWEEP_INTERVAL and time.monotonic() - last_sweep >= UNKNOWN_JOB_SWEEP_INTERVAL:
+            fail_unknown_jobs(JOB_RUNNERS)
+            last_sweep = time.monotonic()
+
+        free = scheduler.free_slots()
+        if not free:
+            time.sleep(0.5)
+            continue
+
+        # Only claim types that can start now, and no more than fit
+        limit = min(sum(free.values()), CLAIM_BATCH_SIZE)
+        with measure("fetch") as fetch:
+            jobs = claim_jobs(limit, job_types=list(free))
+
+        if not jobs:
             time.sleep(3)
             continue
-        
-        print(f"Processing job: {job['id']} ({job['type']})")
-        update_job(job["id"], "processing", progress=0)
-        
-        try:
-            payload = job.get("payload", {})
+
+        for job in jobs:
             job_type = job.get("type", "")
-            
-            if job_type == "voice":
-                out = process_voice_job(payload)
-            elif job_type == "avatar":
-                out = process_avatar_job(payload)
-            elif job_type == "full_avatar":
-                out = process_full_avatar_job(payload)
-            elif job_type == "video":
-                out = process_video_job(payload)
-            elif job_type == "final":
-                out = render_final(payload)
-            else:
-                raise Exception(f"Unknown job type: {job_type}")
-            
-            update_job(job["id"], "completed", result=out, progress=100)
-            print(f"Job {job['id']} completed: {out}")
-            
-        except Exception as e:
-            error_msg = str(e)
-            update_job(job["id"], "error", error=error_msg)
-            print(f"Job {job['id']} failed: {error_msg}")
+            print(f"Processing job: {job['id']} ({job_type})")
+            update_job(job["id"], "processing", progress=0)
+
+            try:
+                scheduler.submit(
+                    job_type,
+                    job.get("payload") or {},
+                    partial(report_progress, job["id"]),
+                    on_done=_on_job_done(job, fetch.to_dict(), after_job),
+                )
+            except Exception as e:
+                update_job(job["id"], "error", error=str(e))
+                print(f"Job {job['id']} failed: {e}")
+
+
+def import_report_main(job_types):
+    """--import-report [types]: import each job type's modules and print the costs as JSON"""
+    for job_type in job_types or list(JOB_MODULES):
+        for module in JOB_MODULES.get(job_type, []):
+            module.load()
+    print(json.dumps({
+        "startup_seconds": round(STARTUP_IMPORT_SECONDS, 4),
+        "target_seconds": WORKER_IMPORT_TARGET,
+        "imports": import_report(),
+    }, indent=2))
 
 
 # Entry point
 if __name__ == "__main__":
-    if RUNPOD_MODE:
+    if "--import-report" in sys.argv:
+        import_report_main(sys.argv[sys.argv.index("--import-report") + 1:])
+    elif RUNPOD_MODE:
         # RunPod serverless mode
         import runpod
+        log_import_report()
+        preload_models()
         runpod.serverless.start({"handler": handler})
     else:
         # Polling mode
-        run_polling_worker()
\ No newline at end of file
+        run_polling_worker()